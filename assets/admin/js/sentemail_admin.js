@@ -1,28 +1,64 @@
 document.addEventListener("DOMContentLoaded", function () {
   const templateSelect = document.getElementById("id_template");
   const subjectField = document.getElementById("id_subject");
+  const storageKey = "emails.sentemail.templates";
+
+  // Subjects and bodies of all active templates, kept for the browser session
+  // so switching templates needs no request.
+  let templates = {};
+  try {
+    templates = JSON.parse(sessionStorage.getItem(storageKey)) || {};
+  } catch (error) {
+    templates = {};
+  }
+
+  function applyTemplate(data) {
+    subjectField.value = data.subject;
+
+    const editorElement = document.querySelector(".fr-element");
+    if (editorElement) {
+      editorElement.innerHTML = data.body;
+      editorElement.focus();
+      subjectField.focus();
+    }
+  }
 
   if (templateSelect && subjectField) {
+    // Refresh the stored templates; unchanged ones come back as a 304
+    fetch("/admin/emails/sentemail/get-templates/", { cache: "no-cache" })
+      .then((response) => response.json())
+      .then((data) => {
+        if (data.success) {
+          templates = data.templates;
+          try {
+            sessionStorage.setItem(storageKey, JSON.stringify(templates));
+          } catch (error) {
+            // Storage full or disabled; keep the in-memory copy only
+          }
+        }
+      })
+      .catch((error) => {
+        console.error("Error fetching templates:", error);
+      });
+
     templateSelect.addEventListener("change", function () {
       const templateId = this.value;
 
       if (templateId) {
+        if (templates[templateId]) {
+          applyTemplate(templates[templateId]);
+          return;
+        }
+
         // Show loading indicator
         const originalSubject = subjectField.value;
 
         // Fetch template data
-        fetch(`/admin/emails/sentemail/get-template/${templateId}/`)
+        fetch(`/admin/emails/sentemail/get-template/${templateId}/`, { cache: "no-cache" })
           .then((response) => response.json())
           .then((data) => {
             if (data.success) {
-              subjectField.value = data.subject;
-
-              const editorElement = document.querySelector(".fr-element");
-              if (editorElement) {
-                editorElement.innerHTML = data.body;
-                editorElement.focus();
-                subjectField.focus();
-              }
+              applyTemplate(data);
             }
           })
           .catch((error) => {
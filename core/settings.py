@@ -80,10 +80,41 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for the web and send worker processes sharing one file: WAL lets
+# readers run alongside a writer, and writers take the write lock when their
+# transaction begins, waiting up to SQLITE_BUSY_TIMEOUT seconds for it, instead
+# of failing with "database is locked" when upgrading a read lock mid-transaction.
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Page cache per connection, in KiB
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+                f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};'
+            ),
+        },
+        # A file rather than in-memory, so tests get WAL and one connection per thread like the app
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Shared by every process using this checkout (web and send worker containers mount the same directory)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get("DJANGO_CACHE_LOCATION", os.path.join(BASE_DIR, ".cache")),
     }
 }
 
@@ -132,9 +163,53 @@ STATICFILES_DIRS = [
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Limit attachment sizes and hash uploads as they stream in, so oversized
+# files are never buffered and attachments can be stored by content
+FILE_UPLOAD_HANDLERS = [
+    "emails.uploads.AttachmentLimitUploadHandler",
+    "emails.uploads.HashingMemoryFileUploadHandler",
+    "emails.uploads.HashingTemporaryFileUploadHandler",
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 EMAIL_BACKEND = "des.backends.ConfiguredEmailBackend"
+
+# Bulk sending
+EMAIL_SEND_BATCH_SIZE = int(os.environ.get("EMAIL_SEND_BATCH_SIZE", 50))
+EMAIL_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("EMAIL_MAX_MESSAGES_PER_CONNECTION", 100))
+EMAIL_SEND_CONCURRENCY = int(os.environ.get("EMAIL_SEND_CONCURRENCY", 4))
+# How long a sender holds claimed emails before other workers may take them over
+EMAIL_SEND_LEASE_SECONDS = int(os.environ.get("EMAIL_SEND_LEASE_SECONDS", 300))
+# Admin selections up to this size are sent immediately instead of queued (0 always queues)
+EMAIL_ADMIN_INLINE_SEND_LIMIT = int(os.environ.get("EMAIL_ADMIN_INLINE_SEND_LIMIT", 0))
+# Number of compiled template subjects/bodies kept in memory per process
+EMAIL_TEMPLATE_CACHE_SIZE = int(os.environ.get("EMAIL_TEMPLATE_CACHE_SIZE", 256))
+EMAIL_CAMPAIGN_CHUNK_SIZE = int(os.environ.get("EMAIL_CAMPAIGN_CHUNK_SIZE", 1000))
+# Upper bound for encoded attachments shared across one send batch
+EMAIL_ATTACHMENT_CACHE_BYTES = int(os.environ.get("EMAIL_ATTACHMENT_CACHE_BYTES", 64 * 1024 * 1024))
+# Attachment size limits, per file and for all attachments of one email
+EMAIL_ATTACHMENT_MAX_BYTES = int(os.environ.get("EMAIL_ATTACHMENT_MAX_BYTES", 5 * 1024 * 1024))
+EMAIL_ATTACHMENT_TOTAL_MAX_BYTES = int(os.environ.get("EMAIL_ATTACHMENT_TOTAL_MAX_BYTES", 20 * 1024 * 1024))
+# Where archive_sent_emails writes old emails and their attachment content
+EMAIL_ARCHIVE_DIR = os.environ.get("EMAIL_ARCHIVE_DIR", os.path.join(BASE_DIR, "archive"))
+EMAIL_ARCHIVE_CHUNK_SIZE = int(os.environ.get("EMAIL_ARCHIVE_CHUNK_SIZE", 1000))
+# Rejected rows of admin CSV imports; kept out of MEDIA_ROOT as they hold names and emails
+RECIPIENT_IMPORT_REJECTS_DIR = os.environ.get(
+    "RECIPIENT_IMPORT_REJECTS_DIR", os.path.join(BASE_DIR, "private", "recipient_imports")
+)
+
+# Outgoing mail quotas per email configuration (0 disables a limit)
+EMAIL_RATE_LIMIT_MESSAGES_PER_MINUTE = int(os.environ.get("EMAIL_RATE_LIMIT_MESSAGES_PER_MINUTE", 0))
+EMAIL_RATE_LIMIT_RECIPIENTS_PER_HOUR = int(os.environ.get("EMAIL_RATE_LIMIT_RECIPIENTS_PER_HOUR", 0))
+# Tokens a bucket may hold; small values pace sends evenly instead of bursting
+EMAIL_RATE_LIMIT_BURST = int(os.environ.get("EMAIL_RATE_LIMIT_BURST", 1))
+
+# Seconds admin changelist totals are cached instead of counted on every load
+ADMIN_CHANGELIST_COUNT_TTL = int(os.environ.get("ADMIN_CHANGELIST_COUNT_TTL", 60))
+
+# Longest time a process keeps using custom variable defaults after they were edited elsewhere
+CUSTOM_VARIABLE_REFRESH_SECONDS = int(os.environ.get("CUSTOM_VARIABLE_REFRESH_SECONDS", 5))
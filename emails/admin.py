@@ -1,17 +1,53 @@
+import csv
+import io
+import tempfile
+
 from django.contrib import admin
 from django.utils.html import format_html
 from django.contrib import messages
 from django.shortcuts import redirect, render
-from django.core.mail import EmailMessage, EmailMultiAlternatives
-from django.utils.html import strip_tags
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files import File
 from django.utils import timezone
 from django import forms
-from django.http import JsonResponse
-from django.urls import path
-import re
-import json
-from .models import TemplateType, EmailTemplate, Recipient, CustomVariable, SentEmail, SentEmailAttachment, Position
+from django.contrib.admin import helpers, widgets
+from django.forms.models import BaseInlineFormSet
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.utils.text import smart_split, unescape_string_literal
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from . import search
+from .campaigns import create_campaign
+from .importer import import_recipients, rejects_storage
+from .loader import iter_send_contexts
+from .models import TemplateType, EmailTemplate, EmailTemplateVersion, Recipient, CustomVariable, SentEmail, SentEmailAttachment, Position, Campaign, DeliveryStat, AttachmentBlob
+from .pagination import CachedCountPaginator, KeysetChangeList
+from .send_queue import Lease, enqueue, write_results
+from .sending import SendInterrupted, send_batch
+from .uploads import megabytes
+from .utils import normalize_email, normalize_name
+from .variables import variable_registry
+
+
+def related_count(model, field):
+    """Correlated COUNT of ``model`` rows whose ``field`` points at the outer row.
+
+    Evaluated only for the rows of the current changelist page, unlike a
+    GROUP BY over the whole table.
+    """
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
 
 
 @admin.register(Position)
@@ -32,6 +68,22 @@ class TemplateTypeAdmin(admin.ModelAdmin):
     fields=  ('name', 'is_active')
 
 
+class EmailTemplateVersionInline(admin.TabularInline):
+    """Read-only history of the snapshots sent emails were written from"""
+    model = EmailTemplateVersion
+    fields = ['number', 'subject', 'created_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(EmailTemplate)
 class EmailTemplateAdmin(admin.ModelAdmin):
     list_display = ['name', 'template_type', 'subject', 'is_active', 'create_email_action']
@@ -39,6 +91,7 @@ class EmailTemplateAdmin(admin.ModelAdmin):
     search_fields = ['name', 'subject', 'body']
     list_editable = ['is_active']
     fields = ('name', 'template_type','subject', 'body', 'is_active')
+    inlines = [EmailTemplateVersionInline]
 
 
     def create_email_action(self, obj):
@@ -63,12 +116,113 @@ class CustomVariableAdmin(admin.ModelAdmin):
 
 
 
+def template_updated_at(template_id):
+    return EmailTemplate.objects.filter(pk=template_id).values_list('updated_at', flat=True).first()
+
+
+def template_etag(request, template_id):
+    updated_at = template_updated_at(template_id)
+    return f'"{template_id}-{updated_at.timestamp()}"' if updated_at else None
+
+
+def template_last_modified(request, template_id):
+    return template_updated_at(template_id)
+
+
+def templates_etag(request):
+    """Changes whenever an active template is added, edited, deactivated or deleted"""
+    state = EmailTemplate.objects.filter(is_active=True).aggregate(latest=Max('updated_at'), total=Count('pk'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    return f'"{state["total"]}-{latest}"'
+
+
+class SentEmailAttachmentForm(forms.ModelForm):
+    """Attachment upload stored through a shared, content-addressed blob"""
+    file = forms.FileField(required=False)
+
+    class Meta:
+        model = SentEmailAttachment
+        fields = ['filename']
+
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['filename'].required = False
+        self.upload_error = (upload_errors or {}).get(self.add_prefix('file'))
+
+    def has_changed(self):
+        # A skipped upload leaves the row looking empty, which would skip its validation
+        return bool(self.upload_error) or super().has_changed()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.upload_error:
+            # Skipped by AttachmentLimitUploadHandler while it was uploading
+            self.add_error('file', self.upload_error)
+        elif not cleaned_data.get('file') and not self.instance.blob_id:
+            self.add_error('file', "Choose a file to attach.")
+        return cleaned_data
+
+    @property
+    def attachment_size(self):
+        """Size this row will attach once saved"""
+        if not self.cleaned_data or self.cleaned_data.get('DELETE'):
+            return 0
+        file_obj = self.cleaned_data.get('file')
+        return file_obj.size if file_obj else self.instance.size or 0
+
+    def save(self, commit=True):
+        file_obj = self.cleaned_data.get('file')
+        if file_obj:
+            self.instance.blob = AttachmentBlob.store(file_obj)
+            self.instance.content_type = getattr(file_obj, 'content_type', None) or 'application/octet-stream'
+            self.instance.size = file_obj.size
+            if not self.cleaned_data.get('filename'):
+                self.instance.filename = file_obj.name
+        return super().save(commit)
+
+
+class SentEmailAttachmentFormSet(BaseInlineFormSet):
+    """Attachments of one email, limited to EMAIL_ATTACHMENT_TOTAL_MAX_BYTES together"""
+    upload_errors = {}
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs['upload_errors'] = self.upload_errors
+        return kwargs
+
+    def clean(self):
+        super().clean()
+        total = sum(form.attachment_size for form in self.forms if form.is_valid())
+        if total > settings.EMAIL_ATTACHMENT_TOTAL_MAX_BYTES:
+            raise forms.ValidationError(
+                f"Total attachment size exceeds the {megabytes(settings.EMAIL_ATTACHMENT_TOTAL_MAX_BYTES)} "
+                f"limit ({megabytes(total)})."
+            )
+
+
 class SentEmailAttachmentInline(admin.TabularInline):
     model = SentEmailAttachment
+    form = SentEmailAttachmentForm
+    formset = SentEmailAttachmentFormSet
     extra = 1
     max_num = 20
-    readonly_fields = ['size_display', 'uploaded_at']
-    fields = ['file', 'filename', 'size_display', 'uploaded_at']
+    readonly_fields = ['download', 'size_display', 'uploaded_at']
+    fields = ['file', 'filename', 'download', 'size_display', 'uploaded_at']
+
+    def download(self, obj):
+        """Link to the stored content"""
+        if not obj.pk or not obj.blob_id:
+            return "N/A"
+        return format_html('<a href="{}">{}</a>', obj.blob.file.url, obj.filename)
+    download.short_description = 'Stored file'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('blob')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.upload_errors = getattr(request, 'upload_errors', {})
+        return formset
 
     def size_display(self, obj):
         """Format file size"""
@@ -88,8 +242,10 @@ def populate_from_template(modeladmin, request, queryset):
     if queryset.count() == 1:
         sent_email = queryset.first()
         if sent_email.template:
-            sent_email.subject = sent_email.template.subject
-            sent_email.body = sent_email.template.body
+            version = sent_email.template.current_version()
+            sent_email.template_version = version
+            sent_email.subject = version.subject
+            sent_email.body = version.body
             sent_email.save()
             modeladmin.message_user(
                 request,
@@ -114,59 +270,52 @@ populate_from_template.short_description = "Populate from template"
 
 
 def send_selected_emails(modeladmin, request, queryset):
-    """Admin action to send selected emails"""
-    sent_count = 0
-    failed_count = 0
-    
-    for sent_email in queryset:
-        if sent_email.status == 'success':
-            continue  # Skip already sent emails
-            
-        success, error_msg = modeladmin.send_email_from_admin(sent_email)
-        if success:
-            sent_email.status = 'success'
-            sent_email.sent_at = timezone.now()
-            sent_email.error_message = ''
-            sent_email.save(update_fields=['status', 'sent_at', 'error_message'])
-            sent_count += 1
-        else:
-            sent_email.status = 'failed'
-            sent_email.error_message = error_msg
-            sent_email.save(update_fields=['status', 'error_message'])
-            failed_count += 1
-    
-    if sent_count == 0:
+    """Admin action to send selected emails, queueing large selections for the send worker"""
+    inline_limit = settings.EMAIL_ADMIN_INLINE_SEND_LIMIT
+    pending = queryset.exclude(status='success')
+    if inline_limit and pending.count() <= inline_limit:
+        report = modeladmin.send_emails_now(pending)
+        if not report.results:
+            modeladmin.message_user(
+                request,
+                f"✓ All Selected recipients was sent before.",
+                messages.WARNING
+            )
+        if report.sent > 0:
+            modeladmin.message_user(
+                request,
+                f"✓ Successfully sent {report.sent} email(s) ({report.rate:.1f} msg/s).",
+                messages.SUCCESS
+            )
+        if report.failed > 0:
+            modeladmin.message_user(
+                request,
+                f"✗ Failed to send {report.failed} email(s).",
+                messages.ERROR
+            )
+        return
+
+    queued_count = enqueue(queryset)
+
+    if queued_count == 0:
         modeladmin.message_user(
             request,
             f"✓ All Selected recipients was sent before.",
             messages.WARNING
         )
-    if sent_count > 0:
+    else:
         modeladmin.message_user(
             request,
-            f"✓ Successfully sent {sent_count} email(s).",
+            f"✓ Queued {queued_count} email(s) for sending.",
             messages.SUCCESS
         )
-    if failed_count > 0:
-        modeladmin.message_user(
-            request,
-            f"✗ Failed to send {failed_count} email(s).",
-            messages.ERROR
-        )
 
 
 send_selected_emails.short_description = "Send selected emails"
 
-from easy_select2 import apply_select2
 class SentEmailAdminForm(forms.ModelForm):
     """Custom form for SentEmail with validation"""
-    class Meta:
-        widgets = {
-            'recipient': apply_select2(forms.Select),
-            'cc_recipients': apply_select2(forms.Select),
-            'bcc_recipients': apply_select2(forms.Select),
-        }
-    
+
     def clean(self):
         cleaned_data = super().clean()
         recipient = cleaned_data.get('recipient')
@@ -198,10 +347,15 @@ class SentEmailAdminForm(forms.ModelForm):
 class SentEmailAdmin(admin.ModelAdmin):
     form = SentEmailAdminForm
     list_display = ['recipient', 'subject', 'status', 'sent_at', 'attachment_count']
-    list_filter = ['status', 'sent_at', 'template']
-    search_fields = ['recipient__name', 'recipient__email', 'subject', 'body']
+    list_filter = ['status', 'sent_at', 'template', 'campaign']
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    # Bodies left unedited are stored on their template version
+    search_fields = ['recipient__name', 'recipient__email', 'subject', 'body', 'template_version__body']
+    # Only the selected recipients are rendered; the rest are searched on demand
+    autocomplete_fields = ['recipient', 'cc_recipients', 'bcc_recipients']
     actions = [populate_from_template, send_selected_emails]
-    readonly_fields = ['sent_at', 'error_message']
+    readonly_fields = ['sent_at', 'queued_at', 'lease_owner', 'lease_expires_at', 'error_message']
     inlines = [SentEmailAttachmentInline]
     fields = ('recipient', 'cc_recipients', 'bcc_recipients', 'template', 'subject',
               'body','interview_datetime','custom_variables'
@@ -213,12 +367,20 @@ class SentEmailAdmin(admin.ModelAdmin):
         js = ('admin/js/sentemail_admin.js',)
 
     def get_urls(self):
-        """Add custom URL for template loading"""
+        """Add custom URLs for template loading"""
         urls = super().get_urls()
+        # Cacheable so browsers keep the responses and revalidate them with ETag/Last-Modified
         custom_urls = [
             path('get-template/<int:template_id>/', 
-                 self.admin_site.admin_view(self.get_template_data),
+                 self.admin_site.admin_view(
+                     condition(template_etag, template_last_modified)(self.get_template_data), cacheable=True
+                 ),
                  name='emails_sentemail_get_template'),
+            path('get-templates/',
+                 self.admin_site.admin_view(
+                     gzip_page(condition(templates_etag)(self.get_templates_data)), cacheable=True
+                 ),
+                 name='emails_sentemail_get_templates'),
         ]
         return custom_urls + urls
 
@@ -226,20 +388,54 @@ class SentEmailAdmin(admin.ModelAdmin):
         """AJAX endpoint to get template data"""
         try:
             template = EmailTemplate.objects.get(pk=template_id)
-            return JsonResponse({
+            response = JsonResponse({
                 'success': True,
                 'subject': template.subject,
                 'body': template.body,
             })
         except EmailTemplate.DoesNotExist:
-            return JsonResponse({
+            response = JsonResponse({
                 'success': False,
                 'error': 'Template not found'
             })
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_templates_data(self, request):
+        """AJAX endpoint with the subject and body of every active template, for caching in the browser"""
+        templates = EmailTemplate.objects.filter(is_active=True).values_list('pk', 'subject', 'body')
+        response = JsonResponse({
+            'success': True,
+            'templates': {pk: {'subject': subject, 'body': body} for pk, subject, body in templates},
+        })
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search subject and body through the full-text index instead of LIKE scans"""
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            term_query = Q(recipient__name__icontains=bit) | Q(recipient__email__icontains=bit)
+            if search.match_query(bit):
+                term_query |= Q(pk__in=search.matching_ids(bit))
+            queryset = queryset.filter(term_query)
+        return queryset, False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipient__position').annotate(
+            attachment_total=related_count(SentEmailAttachment, 'sent_email')
+        )
 
     def attachment_count(self, obj):
         """Display attachment count"""
-        count = obj.attachments.count()
+        count = obj.attachment_total
         if count > 0:
             return format_html(
                 '<span style="background: #10b981; color: white; padding: 2px 8px; border-radius: 4px; font-size: 11px;">{}</span>', 
@@ -247,11 +443,12 @@ class SentEmailAdmin(admin.ModelAdmin):
             )
         return format_html('<span style="color: #6b7280;">0</span>')
     attachment_count.short_description = 'Attachments'
+    attachment_count.admin_order_field = 'attachment_total'
 
     def get_form(self, request, obj=None, **kwargs):
         """Customize form to populate from template when template is selected"""
         form = super().get_form(request, obj, **kwargs)
-        form.base_fields['custom_variables'].initial = dict(CustomVariable.objects.filter(is_active=True).values_list("name","default_value"))
+        form.base_fields['custom_variables'].initial = variable_registry.defaults()
   
         # Pre-populate from URL parameter only on new object
         if obj is None and request.method == 'GET':
@@ -269,167 +466,50 @@ class SentEmailAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         """Handle email sending when saving"""
-        # Validate attachments before saving
-        if not change:  # Only for new objects
-            formset = None
-            if hasattr(request, '_formsets'):
-                for fs in request._formsets:
-                    if fs.model == SentEmailAttachment:
-                        formset = fs
-                        break
-            
-            if formset:
-                total_size = 0
-                for form in formset:
-                    if form.cleaned_data and not form.cleaned_data.get('DELETE'):
-                        if 'file' in form.cleaned_data and form.cleaned_data['file']:
-                            file_obj = form.cleaned_data['file']
-                            # Check individual file size (5MB)
-                            if file_obj.size > 5 * 1024 * 1024:
-                                messages.error(
-                                    request,
-                                    f"File '{file_obj.name}' exceeds 5MB limit ({file_obj.size / (1024*1024):.1f}MB)"
-                                )
-                                return
-                            total_size += file_obj.size
-                
-                # Check total size (20MB)
-                if total_size > 20 * 1024 * 1024:
-                    messages.error(
-                        request,
-                        f"Total attachment size exceeds 20MB limit ({total_size / (1024*1024):.1f}MB)"
-                    )
-                    return
-        
         # Save the object first
         super().save_model(request, obj, form, change)
         
-        # Check if we should send the email
+        # Queue the email for the send worker
         if '_send' in request.POST:
-            success, error_msg = self.send_email_from_admin(obj)
-            if success:
-                obj.status = 'success'
-                obj.sent_at = timezone.now()
-                obj.error_message = ''
-                obj.save(update_fields=['status', 'sent_at', 'error_message'])
-
-                # Build success message with CC and BCC info
-                cc_count = obj.cc_recipients.count()
-                bcc_count = obj.bcc_recipients.count()
-
-                extra_info = []
-                if cc_count > 0:
-                    cc_names = list(obj.cc_recipients.values_list('name', flat=True))
-                    extra_info.append(f"CC: {', '.join(cc_names)}")
-                if bcc_count > 0:
-                    bcc_names = list(obj.bcc_recipients.values_list('name', flat=True))
-                    extra_info.append(f"BCC: {', '.join(bcc_names)}")
-
-                extra_text = f" ({'; '.join(extra_info)})" if extra_info else ""
-
-                messages.success(
-                    request, 
-                    f'✓ Email sent successfully to {obj.recipient.name} ({obj.recipient.email}){extra_text}!'
-                )
-            else:
-                obj.status = 'failed'
-                obj.error_message = error_msg
-                obj.save(update_fields=['status', 'error_message'])
-                messages.error(request, f'✗ Failed to send email: {error_msg}')
-
-    def save_formset(self, request, form, formset, change):
-        """Save formset with file validation"""
-        if formset.model == SentEmailAttachment:
-            instances = formset.save(commit=False)
-            for instance in instances:
-                if instance.file:
-                    # Auto-fill filename and metadata
-                    if not instance.filename:
-                        instance.filename = instance.file.name
-                    if not instance.content_type:
-                        instance.content_type = instance.file.file.content_type if hasattr(instance.file, 'file') else 'application/octet-stream'
-                    if not instance.size:
-                        instance.size = instance.file.size
-                instance.save()
-            formset.save_m2m()
-        else:
-            super().save_formset(request, form, formset, change)
+            if not enqueue(SentEmail.objects.filter(pk=obj.pk)):
+                messages.warning(request, f'Email to {obj.recipient.name} was already sent or is being sent.')
+                return
+
+            # Build queued message with CC and BCC info
+            cc_names = [r.name for r in obj.cc_recipients.all()]
+            bcc_names = [r.name for r in obj.bcc_recipients.all()]
+
+            extra_info = []
+            if cc_names:
+                extra_info.append(f"CC: {', '.join(cc_names)}")
+            if bcc_names:
+                extra_info.append(f"BCC: {', '.join(bcc_names)}")
+
+            extra_text = f" ({'; '.join(extra_info)})" if extra_info else ""
 
-    def send_email_from_admin(self, obj):
-        """Send email from admin interface with full variable replacement and attachments"""
+            messages.success(
+                request,
+                f'✓ Email to {obj.recipient.name} ({obj.recipient.email}){extra_text} queued for sending!'
+            )
+
+    def send_emails_now(self, queryset):
+        """Send emails immediately over parallel connections and save their status.
+
+        Emails are leased first, so rows a send worker is already handling are
+        skipped.
+        """
+        lease = Lease()
+        claimed = lease.claim(queryset.exclude(status='success'))
         try:
-            # Build context for placeholder replacement
-            context = {
-                'name': obj.recipient.name,
-                'email': obj.recipient.email,
-                'position': obj.recipient.position.name if obj.recipient.position else 'N/A',
-            }
-
-            # Add interview date/time if provided
-            if obj.interview_datetime:
-                context['interview_datetime'] = obj.interview_datetime.strftime('%B %d, %Y at %I:%M %p')
-
-            # Add custom variables from the custom_variables JSON field
-            if obj.custom_variables:
-                context.update(obj.custom_variables)
-            
-            # Replace placeholders in subject and body
-            subject = obj.subject
-            body = obj.body
-            
-            for key, value in context.items():
-                placeholder = f'{{{{{key}}}}}'
-                subject = subject.replace(placeholder, str(value))
-                body = body.replace(placeholder, str(value))
-
-            # Check if body contains HTML
-            has_html = bool(re.search(r'<[^>]+>', body))
-
-            if has_html:
-                # Send as HTML email
-                text_content = strip_tags(body)
-                email = EmailMultiAlternatives(
-                    subject=subject,
-                    body=text_content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[obj.recipient.email],
-                )
-                email.attach_alternative(body, "text/html")
-            else:
-                # Send as plain text email
-                email = EmailMessage(
-                    subject=subject,
-                    body=body,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[obj.recipient.email],
-                )
-
-            # Add CC recipients if any
-            cc_emails = list(obj.cc_recipients.values_list('email', flat=True))
-            if cc_emails:
-                email.cc = cc_emails
-                
-            # Add BCC recipients if any
-            bcc_emails = list(obj.bcc_recipients.values_list('email', flat=True))
-            if bcc_emails:
-                email.bcc = bcc_emails
-
-            # Attach files if any
-            attachments = obj.attachments.all()
-            for attachment in attachments:
-                if attachment.file and hasattr(attachment.file, 'path'):
-                    email.attach_file(attachment.file.path)
-
-            # Send email
-            email.send(fail_silently=False)
-            return True, None
-
-        except Exception as e:
-            error_msg = str(e)
-            print(f"Email sending error: {error_msg}")
-            import traceback
-            traceback.print_exc()
-            return False, error_msg
+            try:
+                report = send_batch(iter_send_contexts(SentEmail.objects.filter(pk__in=claimed)))
+            except SendInterrupted as e:
+                write_results(e.report.results, lease)
+                raise
+            write_results(report.results, lease)
+        finally:
+            lease.release()
+        return report
 
     def change_view(self, request, object_id, form_url='', extra_context=None):
         """Add custom context to change view"""
@@ -456,20 +536,247 @@ class SentEmailAdmin(admin.ModelAdmin):
         return super().response_add(request, obj, post_url_continue)
 
 
+class SendTemplateForm(forms.Form):
+    """Options for sending one template to many recipients"""
+    template = forms.ModelChoiceField(queryset=EmailTemplate.objects.filter(is_active=True))
+    name = forms.CharField(max_length=200, required=False, help_text="Campaign name, defaults to the template name and date")
+    cc_recipients = forms.ModelMultipleChoiceField(
+        queryset=Recipient.objects.all(), required=False,
+        widget=widgets.AutocompleteSelectMultiple(SentEmail._meta.get_field('cc_recipients'), admin.site),
+    )
+    bcc_recipients = forms.ModelMultipleChoiceField(
+        queryset=Recipient.objects.all(), required=False,
+        widget=widgets.AutocompleteSelectMultiple(SentEmail._meta.get_field('bcc_recipients'), admin.site),
+    )
+    interview_datetime = forms.SplitDateTimeField(required=False, widget=widgets.AdminSplitDateTime)
+    queue = forms.BooleanField(required=False, initial=True, label="Queue for sending now")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cc_recipients = cleaned_data.get('cc_recipients')
+        bcc_recipients = cleaned_data.get('bcc_recipients')
+        if cc_recipients and bcc_recipients:
+            overlap = cc_recipients.intersection(bcc_recipients)
+            if overlap:
+                overlap_names = ', '.join([r.name for r in overlap])
+                raise forms.ValidationError(f"The following recipients cannot be in both CC and BCC lists: {overlap_names}")
+        return cleaned_data
+
+
+def send_template_to_recipients(modeladmin, request, queryset):
+    """Admin action to create a campaign sending a template to the selected recipients"""
+    if 'post' in request.POST:
+        form = SendTemplateForm(request.POST)
+        if form.is_valid():
+            campaign = create_campaign(
+                form.cleaned_data['template'],
+                queryset,
+                name=form.cleaned_data['name'],
+                cc_recipients=form.cleaned_data['cc_recipients'],
+                bcc_recipients=form.cleaned_data['bcc_recipients'],
+                interview_datetime=form.cleaned_data['interview_datetime'],
+                queue=form.cleaned_data['queue'],
+            )
+            action = "queued" if form.cleaned_data['queue'] else "created"
+            modeladmin.message_user(
+                request,
+                f"✓ Campaign '{campaign.name}': {campaign.recipient_count} email(s) {action}.",
+                messages.SUCCESS
+            )
+            return None
+    else:
+        form = SendTemplateForm()
+
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        'title': "Send template to selected recipients",
+        'opts': modeladmin.model._meta,
+        'form': form,
+        'media': modeladmin.media + form.media,
+        'recipient_count': queryset.count(),
+        'select_across': request.POST.get('select_across') == '1',
+        'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    }
+    return render(request, 'admin/emails/recipient/send_template.html', context)
+
+
+send_template_to_recipients.short_description = "Send template to selected recipients"
+
+
+class RecipientImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label="CSV file",
+        help_text="Columns: name, email and optionally position and notes. Existing recipients are matched by email."
+    )
+
+
+def is_autocomplete(request):
+    return request.resolver_match is not None and request.resolver_match.url_name == 'autocomplete'
+
+
+def prefix_range(prefix):
+    """Bounds ``(start, end)`` such that ``start <= value < end`` for every value starting with ``prefix``"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
 @admin.register(Recipient)
 class RecipientAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'position', 'email_count']
     list_filter = ['position']
     search_fields = ['name', 'email', 'notes']
     fields = ('name', 'email', 'position','notes')
+    actions = [send_template_to_recipients]
+    change_list_template = 'admin/emails/recipient/change_list.html'
+
+    def get_urls(self):
+        """Add custom URLs for CSV import and its rejected rows"""
+        urls = super().get_urls()
+        custom_urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='emails_recipient_import'),
+            path('import/rejects/<str:name>/', self.admin_site.admin_view(self.import_rejects_view),
+                 name='emails_recipient_import_rejects'),
+        ]
+        return custom_urls + urls
+
+    def import_view(self, request):
+        """Upload a CSV of recipients and upsert them in chunks"""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        if request.method == 'POST':
+            form = RecipientImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as rejects:
+                    csv_file = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+                    try:
+                        report = import_recipients(csv_file, lambda: rejects)
+                    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+                        form.add_error('csv_file', f"Could not read CSV: {e}")
+                    else:
+                        messages.success(request, f"✓ Recipients: {report}")
+                        if report.rejected:
+                            rejects.seek(0)
+                            name = rejects_storage().save(
+                                f"rejected-{timezone.now():%Y%m%d-%H%M%S}.csv", File(rejects)
+                            )
+                            messages.warning(request, format_html(
+                                '✗ {} row(s) rejected: <a href="{}">download rejected rows</a>',
+                                report.rejected, reverse('admin:emails_recipient_import_rejects', args=[name])
+                            ))
+                        return redirect('admin:emails_recipient_changelist')
+        else:
+            form = RecipientImportForm()
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Import recipients",
+            'opts': self.model._meta,
+            'form': form,
+        }
+        return render(request, 'admin/emails/recipient/import.html', context)
+
+    def import_rejects_view(self, request, name):
+        """Download the rejected rows of an import, for users allowed to import"""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        storage = rejects_storage()
+        if not name.endswith('.csv') or not storage.exists(name):
+            raise Http404
+        return FileResponse(storage.open(name, 'rb'), as_attachment=True, filename=name, content_type='text/csv')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('position')
+        if is_autocomplete(request):
+            return queryset.order_by('name', 'pk')
+        return queryset.annotate(sent_email_total=related_count(SentEmail, 'recipient'))
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match autocomplete terms as a name or email prefix through the normalized name and email indexes"""
+        if not is_autocomplete(request) or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        name_start, name_end = prefix_range(normalize_name(search_term))
+        email_start, email_end = prefix_range(normalize_email(search_term))
+        queryset = queryset.filter(
+            Q(name_normalized__gte=name_start, name_normalized__lt=name_end)
+            | Q(email_normalized__gte=email_start, email_normalized__lt=email_end)
+        )
+        return queryset, False
 
     def email_count(self, obj):
         """Display count of emails sent to this recipient"""
-        count = obj.sent_emails.count()
+        count = obj.sent_email_total
         if count > 0:
             return format_html(
                 '<a href="/admin/emails/sentemail/?recipient__id__exact={}">{} emails</a>',
                 obj.id, count
             )
         return '0 emails'
-    email_count.short_description = 'Sent Emails'
\ No newline at end of file
+    email_count.short_description = 'Sent Emails'
+    email_count.admin_order_field = 'sent_email_total'
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    list_display = ['name', 'template', 'recipient_count', 'created_at', 'email_link']
+    list_filter = ['template']
+    search_fields = ['name']
+    readonly_fields = ['template', 'recipient_count', 'interview_datetime', 'custom_variables', 'created_at']
+    fields = ('name', 'template', 'recipient_count', 'interview_datetime', 'custom_variables', 'created_at')
+
+    def has_add_permission(self, request):
+        # Campaigns are created from the Recipient "Send template" action
+        return False
+
+    def email_link(self, obj):
+        """Link to the emails of this campaign"""
+        return format_html(
+            '<a href="/admin/emails/sentemail/?campaign__id__exact={}">View emails</a>',
+            obj.id
+        )
+    email_link.short_description = 'Emails'
+
+
+def status_totals(queryset, group_field):
+    """Success/failed/pending totals of DeliveryStat rows grouped by ``group_field`` as ``label``"""
+    return queryset.order_by().values(label=F(group_field)).annotate(
+        success=Coalesce(Sum('count', filter=Q(status='success')), 0),
+        failed=Coalesce(Sum('count', filter=Q(status='failed')), 0),
+        pending=Coalesce(Sum('count', filter=Q(status='pending')), 0),
+        total=Sum('count'),
+    ).order_by('-label' if group_field == 'day' else 'label')
+
+
+@admin.register(DeliveryStat)
+class DeliveryStatAdmin(admin.ModelAdmin):
+    """Delivery dashboard, read from the DeliveryStat rollup only"""
+    change_list_template = 'admin/emails/deliverystat/dashboard.html'
+    date_hierarchy = 'day'
+    list_filter = ['status', 'template__template_type', 'template']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Rows are maintained from SentEmail changes; use rebuild_delivery_stats to recompute
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            queryset = response.context_data['cl'].queryset
+        except (AttributeError, KeyError):
+            return response
+
+        response.context_data['totals'] = queryset.aggregate(
+            success=Coalesce(Sum('count', filter=Q(status='success')), 0),
+            failed=Coalesce(Sum('count', filter=Q(status='failed')), 0),
+            pending=Coalesce(Sum('count', filter=Q(status='pending')), 0),
+        )
+        response.context_data['by_day'] = status_totals(queryset, 'day')[:31]
+        response.context_data['by_template'] = status_totals(queryset, 'template__name')
+        response.context_data['by_template_type'] = status_totals(queryset, 'template__template_type__name')
+        return response
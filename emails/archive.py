@@ -0,0 +1,295 @@
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    AttachmentBlob, Campaign, EmailTemplate, EmailTemplateVersion, Recipient, SentEmail, SentEmailAttachment,
+)
+from . import search, stats
+from .send_queue import unleased
+from .utils import chunked, normalize_email
+
+# Only emails that are done with the send worker are archived
+ARCHIVED_STATUSES = ('success', 'failed')
+# Ids per DELETE statement, well below SQLite's bound parameter limit
+DELETE_CHUNK_SIZE = 500
+
+
+class ArchiveReport:
+    """Outcome of an archive run"""
+
+    def __init__(self):
+        self.archived = 0
+        self.skipped = 0
+        self.files = []
+        self.attachments = 0
+        self.missing_content = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        text = (f"{self.archived} email(s) with {self.attachments} attachment(s) archived into "
+                f"{len(self.files)} file(s) in {self.elapsed:.1f}s")
+        if self.skipped:
+            text += f", {self.skipped} kept as they were queued again meanwhile"
+        return text
+
+
+def person(recipient):
+    return {'id': recipient.pk, 'name': recipient.name, 'email': recipient.email}
+
+
+def archive_record(obj):
+    """Everything needed to show or restore one SentEmail, independent of the hot tables"""
+    return {
+        'id': obj.pk,
+        'recipient': person(obj.recipient),
+        'cc': [person(recipient) for recipient in obj.cc_recipients.all()],
+        'bcc': [person(recipient) for recipient in obj.bcc_recipients.all()],
+        'template_id': obj.template_id,
+        'template_version_id': obj.template_version_id,
+        'campaign_id': obj.campaign_id,
+        'subject': obj.subject,
+        # The effective body, so the record does not depend on the template version surviving
+        'body': obj.body,
+        'interview_datetime': obj.interview_datetime,
+        'custom_variables': obj.custom_variables,
+        'sent_at': obj.sent_at,
+        'status': obj.status,
+        'error_message': obj.error_message,
+        'is_active': obj.is_active,
+        'created_at': obj.created_at,
+        'attachments': [
+            {
+                'filename': attachment.filename,
+                'content_type': attachment.content_type,
+                'size': attachment.size,
+                'sha256': attachment.blob.sha256 if attachment.blob_id else None,
+                'uploaded_at': attachment.uploaded_at,
+            }
+            for attachment in obj.attachments.all()
+        ],
+    }
+
+
+def content_path(directory, sha256):
+    return Path(directory) / 'blobs' / sha256[:2] / sha256
+
+
+def write_atomic(path, write):
+    """Create ``path`` through a temporary file, so a crash never leaves a partial file behind"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    with open(partial, 'wb') as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+
+
+def save_content(directory, blob):
+    """Copy a blob's content into the archive once, returning False if the stored file is missing"""
+    path = content_path(directory, blob.sha256)
+    if path.exists():
+        return True
+    try:
+        with blob.file.open('rb') as source:
+            write_atomic(path, lambda file: shutil.copyfileobj(source, file))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def delete_rows(model, field, values, condition='', params=()):
+    """Plain ``DELETE`` of the ``model`` rows whose ``field`` is in ``values``, skipping delete signals"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    deleted = 0
+    with connection.cursor() as cursor:
+        for chunk in chunked(values, DELETE_CHUNK_SIZE):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders}){condition}', [*chunk, *params])
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_sent_emails(pks):
+    """Delete SentEmails with their CC/BCC links and attachments in a few statements, returning the deleted ids.
+
+    Only emails still finished and unleased are deleted, so one queued again
+    since it was read stays. Does in bulk what their delete signals would do
+    one row at a time: delivery counts, the search index and attachment blob
+    references, all computed from the rows actually deleted.
+    """
+    with transaction.atomic():
+        # The transaction takes the SQLite write lock when it starts (IMMEDIATE), and the rows are locked on
+        # other databases, so nothing changes them between reading the ids and deleting them
+        deletable = SentEmail.objects.filter(unleased(), pk__in=pks, status__in=ARCHIVED_STATUSES)
+        pks = list(deletable.select_for_update().values_list('pk', flat=True))
+        sent_emails = deletable.filter(pk__in=pks)
+        attachments = SentEmailAttachment.objects.filter(sent_email__in=pks)
+        stats.apply_deltas({key: -count for key, count in stats.raw_counts(sent_emails).items()})
+        blob_counts = attachments.exclude(blob=None).order_by().values_list('blob').annotate(total=Count('pk'))
+        for blob_id, total in blob_counts:
+            AttachmentBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - total)
+        search.remove_emails(pks)
+        # Plain DELETEs rather than QuerySet.delete(), which would collect every row and
+        # send the delete signals whose work is done above
+        delete_rows(SentEmailAttachment, 'sent_email', pks)
+        for through in (SentEmail.cc_recipients.through, SentEmail.bcc_recipients.through):
+            delete_rows(through, 'sentemail', pks)
+        # Repeats the conditions the ids were read with
+        placeholders = ', '.join(['%s'] * len(ARCHIVED_STATUSES))
+        delete_rows(
+            SentEmail, 'id', pks,
+            f' AND status IN ({placeholders}) AND (lease_expires_at IS NULL OR lease_expires_at < %s)',
+            [*ARCHIVED_STATUSES, connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+    return pks
+
+
+def old_sent_emails(days):
+    """Finished emails sent more than ``days`` days ago"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return SentEmail.objects.filter(sent_at__lt=cutoff, status__in=ARCHIVED_STATUSES)
+
+
+def archive_sent_emails(queryset, directory, chunk_size=1000):
+    """Move SentEmails into gzipped JSON Lines files under ``directory``, one file per chunk.
+
+    Each chunk is written and synced to disk before its rows are deleted in
+    one transaction per chunk, so at worst a crash leaves rows both archived
+    and still present, which restoring skips. The same goes for rows queued
+    for resending while their chunk was written: they are archived but kept.
+    Attachment content is copied to a content-addressed ``blobs/`` directory;
+    the blobs left unreferenced in the database are removed by
+    ``gc_attachment_blobs``.
+    """
+    started = time.monotonic()
+    report = ArchiveReport()
+    run = timezone.now().strftime('%Y%m%dT%H%M%S')
+    queryset = queryset.select_related('recipient', 'template_version').prefetch_related(
+        'cc_recipients', 'bcc_recipients', 'attachments__blob'
+    ).order_by('pk')
+
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+
+        for obj in chunk:
+            for attachment in obj.attachments.all():
+                report.attachments += 1
+                if attachment.blob_id and not save_content(directory, attachment.blob):
+                    report.missing_content += 1
+        lines = b''.join(
+            json.dumps(archive_record(obj), cls=DjangoJSONEncoder).encode() + b'\n' for obj in chunk
+        )
+        path = Path(directory) / 'sent_emails' / f'{run}-{len(report.files) + 1:05d}.jsonl.gz'
+        write_atomic(path, lambda file: file.write(gzip.compress(lines)))
+        report.files.append(path)
+
+        deleted = delete_sent_emails([obj.pk for obj in chunk])
+        report.archived += len(deleted)
+        report.skipped += len(chunk) - len(deleted)
+
+    report.elapsed = time.monotonic() - started
+    return report
+
+
+def archive_files(directory):
+    return sorted((Path(directory) / 'sent_emails').glob('*.jsonl.gz'))
+
+
+def iter_archive(paths):
+    """Stream archived records from archive files, one decompressed line at a time"""
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                yield json.loads(line)
+
+
+def matches(record, term='', recipient=''):
+    """Whether a record contains ``term`` in its subject, body or addresses, and was sent to ``recipient``"""
+    people = [record['recipient'], *record['cc'], *record['bcc']]
+    if recipient and normalize_email(recipient) not in {normalize_email(p['email']) for p in people}:
+        return False
+    if not term:
+        return True
+    term = term.lower()
+    haystack = [record['subject'], record['body'], *(p['name'] for p in people), *(p['email'] for p in people)]
+    return any(term in text.lower() for text in haystack)
+
+
+def search_archive(directory, term='', recipient='', ids=()):
+    """Archived records matching ``term`` and ``recipient``, or with one of ``ids``"""
+    ids = set(ids)
+    for record in iter_archive(archive_files(directory)):
+        if ids and record['id'] not in ids:
+            continue
+        if matches(record, term, recipient):
+            yield record
+
+
+def restore_recipient(data):
+    recipient = Recipient.objects.filter(email_normalized=normalize_email(data['email'])).first()
+    if recipient is None:
+        recipient = Recipient.objects.create(name=data['name'], email=data['email'])
+    return recipient
+
+
+def existing_pk(model, pk):
+    return pk if pk is not None and model.objects.filter(pk=pk).exists() else None
+
+
+def restore_record(record, directory):
+    """Recreate one archived email with its links and attachments, returning False if its id is taken"""
+    if SentEmail.objects.filter(pk=record['id']).exists():
+        return False
+    with transaction.atomic():
+        interview_datetime = record['interview_datetime']
+        sent_email = SentEmail(
+            pk=record['id'],
+            recipient=restore_recipient(record['recipient']),
+            template_id=existing_pk(EmailTemplate, record['template_id']),
+            template_version_id=existing_pk(EmailTemplateVersion, record['template_version_id']),
+            campaign_id=existing_pk(Campaign, record['campaign_id']),
+            subject=record['subject'],
+            body=record['body'],
+            interview_datetime=parse_datetime(interview_datetime) if interview_datetime else None,
+            custom_variables=record['custom_variables'],
+            sent_at=parse_datetime(record['sent_at']),
+            status=record['status'],
+            error_message=record['error_message'],
+            is_active=record['is_active'],
+        )
+        sent_email.save(force_insert=True)
+        SentEmail.objects.filter(pk=sent_email.pk).update(created_at=parse_datetime(record['created_at']))
+        sent_email.cc_recipients.set([restore_recipient(data) for data in record['cc']])
+        sent_email.bcc_recipients.set([restore_recipient(data) for data in record['bcc']])
+        for data in record['attachments']:
+            blob = None
+            path = content_path(directory, data['sha256']) if data['sha256'] else None
+            if path is not None and path.exists():
+                with open(path, 'rb') as content:
+                    blob = AttachmentBlob.store(File(content, name=data['filename']))
+            SentEmailAttachment.objects.create(
+                sent_email=sent_email,
+                blob=blob,
+                filename=data['filename'],
+                content_type=data['content_type'],
+                size=data['size'],
+            )
+    return True
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import search, stats
+from .models import Campaign, SentEmail
+from .utils import chunked
+from .variables import variable_registry
+
+
+def create_campaign(template, recipients, name='', cc_recipients=(), bcc_recipients=(),
+                    interview_datetime=None, custom_variables=None, queue=False, chunk_size=None):
+    """Create one SentEmail per recipient for ``template``.
+
+    Rows and their CC/BCC links are inserted with ``bulk_create`` in chunked
+    transactions. Recipients are never copied on their own email. With
+    ``queue`` the emails are queued for the send worker right away.
+    """
+    if chunk_size is None:
+        chunk_size = settings.EMAIL_CAMPAIGN_CHUNK_SIZE
+    if custom_variables is None:
+        custom_variables = variable_registry.defaults()
+
+    campaign = Campaign.objects.create(
+        name=name or f"{template.name} - {timezone.now():%Y-%m-%d %H:%M}",
+        template=template,
+        interview_datetime=interview_datetime,
+        custom_variables=custom_variables,
+    )
+
+    cc_ids = [recipient.pk for recipient in cc_recipients]
+    bcc_ids = [recipient.pk for recipient in bcc_recipients]
+    CC = SentEmail.cc_recipients.through
+    BCC = SentEmail.bcc_recipients.through
+    queued_at = timezone.now() if queue else None
+
+    version = template.current_version()
+    total = 0
+    recipient_ids = list(recipients.order_by('pk').values_list('pk', flat=True))
+    for chunk in chunked(recipient_ids, chunk_size):
+        with transaction.atomic():
+            sent_emails = SentEmail.objects.bulk_create([
+                SentEmail(
+                    recipient_id=recipient_id,
+                    template=template,
+                    template_version=version,
+                    campaign=campaign,
+                    subject=version.subject,
+                    # Stored empty, as it is the version's body
+                    body=version.body,
+                    interview_datetime=interview_datetime,
+                    custom_variables=custom_variables,
+                    queued_at=queued_at,
+                )
+                for recipient_id in chunk
+            ])
+            CC.objects.bulk_create([
+                CC(sentemail_id=sent_email.pk, recipient_id=cc_id)
+                for sent_email in sent_emails for cc_id in cc_ids if cc_id != sent_email.recipient_id
+            ])
+            BCC.objects.bulk_create([
+                BCC(sentemail_id=sent_email.pk, recipient_id=bcc_id)
+                for sent_email in sent_emails for bcc_id in bcc_ids if bcc_id != sent_email.recipient_id
+            ])
+            search.index_emails(sent_emails)
+            stats.count_new(sent_emails)
+        total += len(sent_emails)
+
+    campaign.recipient_count = total
+    campaign.save(update_fields=['recipient_count', 'updated_at'])
+    return campaign
@@ -0,0 +1,141 @@
+import csv
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import Position, Recipient
+from .utils import chunked, normalize_email, normalize_name
+
+
+def rejects_storage():
+    """Storage for rejected import rows, which is not served publicly"""
+    return FileSystemStorage(location=settings.RECIPIENT_IMPORT_REJECTS_DIR, base_url=None)
+
+
+class ImportReport:
+    """Outcome of a recipient import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.positions_created = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        """Rows per second"""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows: {self.imported} imported, {self.rejected} rejected in {self.elapsed:.1f}s "
+                f"({self.rate:.0f} rows/s)")
+
+
+class RejectWriter:
+    """CSV of rejected rows with an ``error`` column, opened on the first rejected row"""
+
+    def __init__(self, open_file, fieldnames):
+        self.open_file = open_file
+        self.fieldnames = [*fieldnames, 'error']
+        self.writer = None
+
+    def write(self, row, error):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.open_file(), self.fieldnames, extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerow({**row, 'error': error})
+
+
+class PositionMap:
+    """Position ids by case-insensitive name, creating missing positions once"""
+
+    def __init__(self):
+        self.ids = {name.lower(): pk for name, pk in Position.objects.values_list('name', 'pk')}
+        self.created = 0
+
+    def get(self, name):
+        key = name.lower()
+        if key not in self.ids:
+            position, created = Position.objects.get_or_create(name=name)
+            self.ids[key] = position.pk
+            self.created += created
+        return self.ids[key]
+
+
+def clean_row(row, positions):
+    """Build an unsaved Recipient from a CSV row, raising ValidationError for bad rows"""
+    name = (row.get('name') or '').strip()
+    email = (row.get('email') or '').strip()
+    if not name:
+        raise ValidationError("Missing name")
+    if not email:
+        raise ValidationError("Missing email")
+    validate_email(email)
+    if len(name) > Recipient._meta.get_field('name').max_length:
+        raise ValidationError("Name is too long")
+    position = (row.get('position') or '').strip()
+    return Recipient(
+        name=name,
+        email=email,
+        email_normalized=normalize_email(email),
+        name_normalized=normalize_name(name),
+        position_id=positions.get(position) if position else None,
+        notes=(row.get('notes') or '').strip(),
+    )
+
+
+def import_recipients(csv_file, open_rejects, chunk_size=1000):
+    """Create or update recipients from a CSV text stream, matching existing ones on email.
+
+    Rows are read one chunk at a time and upserted with a single
+    ``bulk_create`` on the normalized email, so case variants update the same
+    recipient. Only the columns present in the file are overwritten on
+    existing recipients, and their email keeps its original spelling. Invalid
+    rows are written through ``open_rejects`` (a callable returning a text
+    file, only called if a row is rejected) and do not stop the import.
+    """
+    started = time.monotonic()
+    report = ImportReport()
+    reader = csv.DictReader(csv_file)
+    fieldnames = [name.strip().lower() for name in reader.fieldnames or ()]
+    reader.fieldnames = fieldnames
+    missing = {'name', 'email'} - set(fieldnames)
+    if missing:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(sorted(missing))}")
+
+    update_fields = [field for field in ('name', 'position', 'notes') if field in fieldnames] + ['updated_at']
+    if 'name' in update_fields:
+        update_fields.append('name_normalized')
+    positions = PositionMap()
+    rejects = RejectWriter(open_rejects, fieldnames)
+
+    for chunk in chunked(reader, chunk_size):
+        report.rows += len(chunk)
+        recipients = {}
+        for row in chunk:
+            try:
+                recipient = clean_row(row, positions)
+            except ValidationError as e:
+                rejects.write(row, '; '.join(e.messages))
+                report.rejected += 1
+                continue
+            # Later rows for the same email win, as they would row by row
+            recipients.pop(recipient.email_normalized, None)
+            recipients[recipient.email_normalized] = recipient
+        with transaction.atomic():
+            Recipient.objects.bulk_create(
+                list(recipients.values()),
+                update_conflicts=True,
+                unique_fields=['email_normalized'],
+                update_fields=update_fields,
+            )
+        report.imported += len(recipients)
+
+    report.positions_created = positions.created
+    report.elapsed = time.monotonic() - started
+    return report
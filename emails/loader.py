@@ -0,0 +1,24 @@
+from django.conf import settings
+
+from .sending import SendContext
+
+SEND_SELECT_RELATED = ('recipient__position', 'template_version')
+SEND_PREFETCH_RELATED = ('cc_recipients', 'bcc_recipients', 'attachments__blob')
+
+
+def with_send_relations(queryset):
+    """Join and prefetch everything the sender reads from each SentEmail"""
+    return queryset.select_related(*SEND_SELECT_RELATED).prefetch_related(*SEND_PREFETCH_RELATED)
+
+
+def iter_send_contexts(queryset, chunk_size=None):
+    """Stream ``SendContext`` objects for a queryset of SentEmails.
+
+    Rows are fetched ``chunk_size`` at a time with their relations prefetched
+    per chunk, so the query count per chunk is constant and memory stays flat
+    however many emails are selected.
+    """
+    if chunk_size is None:
+        chunk_size = settings.EMAIL_SEND_BATCH_SIZE
+    for obj in with_send_relations(queryset).iterator(chunk_size=chunk_size):
+        yield SendContext(obj)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emails.archive import archive_sent_emails, old_sent_emails
+
+
+class Command(BaseCommand):
+    help = "Move sent or failed emails older than a number of days into compressed archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help="Archive emails sent more than this many days ago")
+        parser.add_argument('--dir', default=settings.EMAIL_ARCHIVE_DIR, help="Archive directory")
+        parser.add_argument('--chunk-size', type=int, default=settings.EMAIL_ARCHIVE_CHUNK_SIZE,
+                            help="Emails per archive file and per delete transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the emails that would be archived")
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError("--older-than must not be negative.")
+        queryset = old_sent_emails(options['older_than'])
+        if options['dry_run']:
+            self.stdout.write(f"{queryset.count()} email(s) would be archived.")
+            return
+
+        report = archive_sent_emails(queryset, options['dir'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archive: {report}"))
+        if report.missing_content:
+            self.stdout.write(self.style.WARNING(
+                f"{report.missing_content} attachment(s) had no stored content; only their details were archived."
+            ))
+        if report.attachments:
+            self.stdout.write("Run gc_attachment_blobs to free attachment content no longer in use.")
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from emails.models import AttachmentBlob, SentEmailAttachment
+
+# Storage directories holding attachment content, current and from before blobs
+ATTACHMENT_DIRS = ('attachment_blobs', 'email_attachments')
+
+
+class Command(BaseCommand):
+    help = "Delete attachment blobs that no attachment refers to any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help="Keep unreferenced content this recent, as an upload may still be attaching it")
+        parser.add_argument('--sweep-files', action='store_true',
+                            help="Also delete stored attachment files that no blob points to")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        repaired = 0
+        drifted = AttachmentBlob.objects.annotate(actual=Count('attachments')).exclude(ref_count=F('actual'))
+        for blob_id, actual in drifted.values_list('pk', 'actual'):
+            repaired += AttachmentBlob.objects.filter(pk=blob_id).update(ref_count=actual)
+        if repaired:
+            self.stdout.write(self.style.WARNING(f"Corrected the reference count of {repaired} blob(s)."))
+
+        referenced = SentEmailAttachment.objects.filter(blob=OuterRef('pk'))
+        deleted = freed = 0
+        for blob in AttachmentBlob.objects.filter(ref_count=0, created_at__lt=cutoff):
+            # Re-check in the DELETE itself so a blob reused meanwhile is kept
+            removed, _ = AttachmentBlob.objects.filter(pk=blob.pk, ref_count=0).exclude(Exists(referenced)).delete()
+            if removed:
+                blob.file.delete(save=False)
+                deleted += 1
+                freed += blob.size
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced blob(s), {freed} bytes."))
+
+        if options['sweep_files']:
+            swept = self.sweep_files(cutoff)
+            self.stdout.write(self.style.SUCCESS(f"Deleted {swept} file(s) not stored in any blob."))
+
+    def sweep_files(self, cutoff):
+        kept = set(AttachmentBlob.objects.values_list('file', flat=True))
+        swept = 0
+        for name in self.stored_files(ATTACHMENT_DIRS):
+            if name not in kept and default_storage.get_modified_time(name) < cutoff:
+                default_storage.delete(name)
+                swept += 1
+        return swept
+
+    def stored_files(self, directories):
+        for directory in directories:
+            if not default_storage.exists(directory):
+                continue
+            subdirectories, files = default_storage.listdir(directory)
+            for name in files:
+                yield f'{directory}/{name}'
+            yield from self.stored_files(f'{directory}/{subdirectory}' for subdirectory in subdirectories)
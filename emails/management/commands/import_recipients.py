@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from emails.importer import import_recipients
+
+
+class Command(BaseCommand):
+    help = "Create or update recipients from a CSV file with name, email and optional position and notes columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import")
+        parser.add_argument('--rejects', help="Where to write rejected rows (default: <path>.rejected.csv)")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows upserted per statement")
+
+    def handle(self, *args, **options):
+        rejects_path = options['rejects'] or f"{options['path']}.rejected.csv"
+        rejects_file = None
+
+        def open_rejects():
+            nonlocal rejects_file
+            rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+            return rejects_file
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+                report = import_recipients(csv_file, open_rejects, options['chunk_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Recipients: {report}"))
+        if report.positions_created:
+            self.stdout.write(f"Created {report.positions_created} position(s).")
+        if report.rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected rows written to {rejects_path}"))
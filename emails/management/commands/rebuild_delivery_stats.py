@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from emails import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute delivery statistics from the sent emails table, or check them against it"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare the statistics with the sent emails table and fail on any difference",
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            total = stats.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} delivery statistic row(s)."))
+            return
+
+        differences = stats.differences()
+        for (day, template_id, status), (rollup, actual) in sorted(differences.items(), key=str):
+            self.stdout.write(f"{day} template={template_id} {status}: counted {rollup}, actual {actual}")
+        if differences:
+            raise CommandError(
+                f"{len(differences)} delivery statistic(s) out of date; run rebuild_delivery_stats to fix."
+            )
+        self.stdout.write(self.style.SUCCESS("Delivery statistics match the sent emails table."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from emails import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of sent emails from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows indexed per chunk")
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search requires the SQLite database backend.")
+        total = search.rebuild_index(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} sent email(s)."))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from emails.archive import restore_record, search_archive
+
+
+class Command(BaseCommand):
+    help = "Restore archived emails into the database by id"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='+', type=int, help="Ids of the archived emails, as shown by search_archive")
+        parser.add_argument('--dir', default=settings.EMAIL_ARCHIVE_DIR, help="Archive directory")
+
+    def handle(self, *args, **options):
+        wanted = set(options['ids'])
+        restored = skipped = 0
+        for record in search_archive(options['dir'], ids=wanted):
+            wanted.discard(record['id'])
+            if restore_record(record, options['dir']):
+                restored += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} email(s)."))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} email(s) that are already in the database."))
+        if wanted:
+            raise CommandError(f"Not found in the archive: {', '.join(map(str, sorted(wanted)))}")
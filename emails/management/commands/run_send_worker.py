@@ -0,0 +1,89 @@
+import logging
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from emails.loader import iter_send_contexts
+from emails.models import SentEmail
+from emails.send_queue import Lease, queued_emails, write_results
+from emails.sending import SendInterrupted, send_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send queued emails in batches until stopped (SIGTERM/SIGINT finish the current message first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_SEND_BATCH_SIZE,
+                            help="Number of emails fetched and sent per batch")
+        parser.add_argument('--concurrency', type=int, default=settings.EMAIL_SEND_CONCURRENCY,
+                            help="Number of parallel SMTP connections")
+        parser.add_argument('--max-per-connection', type=int, default=settings.EMAIL_MAX_MESSAGES_PER_CONNECTION,
+                            help="Reconnect after this many messages (0 for no limit)")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Exit as soon as the queue is empty")
+
+    def handle(self, *args, **options):
+        self.stop_event = threading.Event()
+        self.poll_interval = options['poll_interval']
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+        self.stdout.write(
+            f"Send worker started (batch size {options['batch_size']}, concurrency {options['concurrency']})"
+        )
+        lease = Lease()
+        started = time.monotonic()
+        total = 0
+        try:
+            while not self.stop_event.is_set():
+                batch = lease.claim(queued_emails(), options['batch_size'])
+                if not batch:
+                    if options['once']:
+                        break
+                    self.stop_event.wait(options['poll_interval'])
+                    continue
+                total += self.process_batch(batch, lease, options['concurrency'], options['max_per_connection'])
+        finally:
+            lease.release()
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0.0
+        self.stdout.write(f"Send worker stopped after {total} email(s) in {elapsed:.1f}s ({rate:.1f} msg/s)")
+
+    def request_stop(self, signum, frame):
+        self.stdout.write("Stop requested, finishing in-flight message...")
+        self.stop_event.set()
+
+    def process_batch(self, batch, lease, concurrency, max_per_connection):
+        """Send a batch of claimed email ids and write back the status of every processed email.
+
+        Emails not reached before a stop request are released back to the queue.
+        If the batch is interrupted by an error, e.g. the database being locked
+        while renewing the lease, the emails already sent are recorded, the rest
+        are released and the worker carries on after a poll interval. Returns
+        the number of processed emails.
+        """
+        contexts = iter_send_contexts(
+            SentEmail.objects.filter(pk__in=batch).order_by('queued_at', 'pk'), chunk_size=len(batch)
+        )
+        try:
+            report = send_batch(
+                contexts, concurrency, max_per_connection, stop_event=self.stop_event, heartbeat=lease.renew_if_due
+            )
+        except SendInterrupted as e:
+            # Record what was sent before the lease is released, so it is not sent again
+            write_results(e.report.results, lease)
+            logger.exception("Send batch interrupted after %s email(s)", len(e.report.results))
+            self.stdout.write(self.style.ERROR(f"Batch interrupted: {e.__cause__}"))
+            lease.release()
+            self.stop_event.wait(self.poll_interval)
+            return len(e.report.results)
+        write_results(report.results, lease)
+
+        self.stdout.write(f"Batch: {report}")
+        return len(report.results)
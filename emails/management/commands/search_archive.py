@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from emails.archive import search_archive
+
+
+class Command(BaseCommand):
+    help = "Search archived emails by text and recipient without restoring them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', nargs='?', default='', help="Text to find in subject, body, names or addresses")
+        parser.add_argument('--recipient', default='', help="Only emails sent to, or copied to, this address")
+        parser.add_argument('--dir', default=settings.EMAIL_ARCHIVE_DIR, help="Archive directory")
+        parser.add_argument('--limit', type=int, default=100, help="Stop after this many matches (0 for all)")
+
+    def handle(self, *args, **options):
+        found = 0
+        for record in search_archive(options['dir'], options['term'], options['recipient']):
+            found += 1
+            self.stdout.write(
+                f"{record['id']}\t{record['sent_at']}\t{record['status']}\t"
+                f"{record['recipient']['email']}\t{record['subject']}"
+            )
+            if found == options['limit']:
+                break
+        self.stdout.write(self.style.SUCCESS(f"{found} archived email(s) found."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentemail',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, help_text='When this email was queued for the send worker', null=True),
+        ),
+    ]
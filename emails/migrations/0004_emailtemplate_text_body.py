@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+from emails.rendering import has_static_html, text_skeleton
+
+
+def precompute_text_bodies(apps, schema_editor):
+    EmailTemplate = apps.get_model('emails', 'EmailTemplate')
+    for template in EmailTemplate.objects.all():
+        template.is_html = has_static_html(template.body)
+        template.text_body = text_skeleton(template.body) if template.is_html else ''
+        template.save(update_fields=['is_html', 'text_body'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0003_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailtemplate',
+            name='is_html',
+            field=models.BooleanField(default=False, editable=False, help_text='Body contains HTML regardless of placeholder values'),
+        ),
+        migrations.AddField(
+            model_name='emailtemplate',
+            name='text_body',
+            field=models.TextField(blank=True, editable=False, help_text='Plain-text alternative with placeholders kept'),
+        ),
+        migrations.RunPython(precompute_text_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0005_campaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentemail',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentemail',
+            name='lease_owner',
+            field=models.CharField(blank=True, help_text='Sender process currently holding this email', max_length=100),
+        ),
+    ]
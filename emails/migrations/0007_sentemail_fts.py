@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.utils.html import strip_tags
+
+from emails.utils import chunked
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    SentEmail = apps.get_model('emails', 'SentEmail')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS emails_sentemail_fts "
+        "USING fts5(subject, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    rows = SentEmail.objects.only('pk', 'subject', 'body').iterator(chunk_size=1000)
+    with schema_editor.connection.cursor() as cursor:
+        for chunk in chunked(rows, 1000):
+            cursor.executemany(
+                'INSERT INTO emails_sentemail_fts (rowid, subject, body) VALUES (%s, %s, %s)',
+                [(obj.pk, obj.subject, strip_tags(obj.body)) for obj in chunk]
+            )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS emails_sentemail_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0006_sentemail_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0007_sentemail_fts'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='sentemail',
+            options={'ordering': ['-sent_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='sentemail',
+            index=models.Index(fields=['-sent_at', '-id'], name='sentemail_sent_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0008_sentemail_sent_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sentemail',
+            index=models.Index(fields=['status', '-sent_at', '-id'], name='sentemail_status_sent_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentemail',
+            index=models.Index(fields=['recipient', '-sent_at', '-id'], name='sentemail_recipient_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentemail',
+            index=models.Index(condition=models.Q(('queued_at__isnull', False)), fields=['status', 'queued_at', 'id'], name='sentemail_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentemail',
+            index=models.Index(fields=['lease_owner', 'status'], name='sentemail_lease_owner_idx'),
+        ),
+    ]
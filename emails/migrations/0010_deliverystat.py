@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_delivery_stats(apps, schema_editor):
+    SentEmail = apps.get_model('emails', 'SentEmail')
+    DeliveryStat = apps.get_model('emails', 'DeliveryStat')
+    rows = (
+        SentEmail.objects.order_by()
+        .annotate(day=TruncDate('sent_at'))
+        .values_list('day', 'template_id', 'status')
+        .annotate(total=Count('pk'))
+    )
+    DeliveryStat.objects.bulk_create([
+        DeliveryStat(day=day, template_id=template_id, status=status, count=total)
+        for day, template_id, status, total in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0009_sentemail_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('template', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='delivery_stats', to='emails.emailtemplate')),
+            ],
+            options={
+                'verbose_name': 'Delivery statistic',
+                'verbose_name_plural': 'Delivery statistics',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'template', 'status'), name='deliverystat_unique_key')],
+            },
+        ),
+        migrations.RunPython(backfill_delivery_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:51
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0010_deliverystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipient',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='recipient_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipient',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='recipient_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from emails.utils import chunked, normalize_email
+
+
+def merge_duplicate_recipients(apps, schema_editor):
+    """Merge recipients whose emails only differ in case into the oldest one, then fill email_normalized"""
+    Recipient = apps.get_model('emails', 'Recipient')
+    SentEmail = apps.get_model('emails', 'SentEmail')
+    links = [
+        SentEmail._meta.get_field('cc_recipients').remote_field.through,
+        SentEmail._meta.get_field('bcc_recipients').remote_field.through,
+    ]
+
+    keepers = {}
+    duplicates = defaultdict(list)
+    for pk, email in Recipient.objects.order_by('pk').values_list('pk', 'email').iterator():
+        key = normalize_email(email)
+        if key in keepers:
+            duplicates[keepers[key]].append(pk)
+        else:
+            keepers[key] = pk
+
+    for keeper_pk, duplicate_pks in duplicates.items():
+        SentEmail.objects.filter(recipient_id__in=duplicate_pks).update(recipient_id=keeper_pk)
+        for Link in links:
+            linked = set(Link.objects.filter(recipient_id=keeper_pk).values_list('sentemail_id', flat=True))
+            for link in Link.objects.filter(recipient_id__in=duplicate_pks):
+                if link.sentemail_id in linked:
+                    link.delete()
+                else:
+                    Link.objects.filter(pk=link.pk).update(recipient_id=keeper_pk)
+                    linked.add(link.sentemail_id)
+            # Never copy the merged recipient on their own email
+            Link.objects.filter(recipient_id=keeper_pk, sentemail__recipient_id=keeper_pk).delete()
+
+        keeper = Recipient.objects.get(pk=keeper_pk)
+        for duplicate in Recipient.objects.filter(pk__in=duplicate_pks).order_by('pk'):
+            keeper.position_id = keeper.position_id or duplicate.position_id
+            if duplicate.notes and duplicate.notes not in keeper.notes:
+                keeper.notes = '\n'.join(filter(None, [keeper.notes, duplicate.notes]))
+        keeper.save(update_fields=['position', 'notes'])
+        Recipient.objects.filter(pk__in=duplicate_pks).delete()
+
+    rows = Recipient.objects.order_by('pk').values_list('pk', 'email').iterator(chunk_size=1000)
+    with schema_editor.connection.cursor() as cursor:
+        for chunk in chunked(rows, 1000):
+            cursor.executemany(
+                f'UPDATE {Recipient._meta.db_table} SET email_normalized = %s WHERE id = %s',
+                [(normalize_email(email), pk) for pk, email in chunk]
+            )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0012_recipient_email_normalized'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_recipients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0013_merge_duplicate_recipients'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipient',
+            name='email_normalized',
+            field=models.CharField(editable=False, help_text='Lowercased email for case-insensitive matching', max_length=254, unique=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+import hashlib
+from collections import Counter
+
+from django.db import migrations
+
+
+def store_attachments_as_blobs(apps, schema_editor):
+    """Point every attachment at a blob of its content, sharing blobs between identical files.
+
+    A blob takes over the file of the first attachment with its content;
+    duplicate files are left on disk for gc_attachment_blobs --sweep-files.
+    Attachments whose file can no longer be read are left without a blob.
+    """
+    AttachmentBlob = apps.get_model('emails', 'AttachmentBlob')
+    SentEmailAttachment = apps.get_model('emails', 'SentEmailAttachment')
+
+    blobs = dict(AttachmentBlob.objects.values_list('sha256', 'pk'))
+    references = Counter()
+    for attachment in SentEmailAttachment.objects.exclude(file='').order_by('pk').iterator():
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with attachment.file.open('rb') as f:
+                for chunk in f.chunks():
+                    sha256.update(chunk)
+                    size += len(chunk)
+        except OSError:
+            continue
+        digest = sha256.hexdigest()
+        if digest not in blobs:
+            blobs[digest] = AttachmentBlob.objects.create(sha256=digest, file=attachment.file.name, size=size).pk
+        SentEmailAttachment.objects.filter(pk=attachment.pk).update(blob_id=blobs[digest])
+        references[blobs[digest]] += 1
+
+    for blob_id, count in references.items():
+        AttachmentBlob.objects.filter(pk=blob_id).update(ref_count=count)
+
+
+def restore_attachment_files(apps, schema_editor):
+    SentEmailAttachment = apps.get_model('emails', 'SentEmailAttachment')
+    for attachment in SentEmailAttachment.objects.filter(blob__isnull=False).select_related('blob').iterator():
+        SentEmailAttachment.objects.filter(pk=attachment.pk).update(file=attachment.blob.file.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0015_attachmentblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(store_attachments_as_blobs, restore_attachment_files),
+    ]
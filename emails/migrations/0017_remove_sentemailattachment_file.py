@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0016_attachment_blobs_from_files'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='sentemailattachment',
+            name='file',
+        ),
+    ]
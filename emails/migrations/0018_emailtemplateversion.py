@@ -0,0 +1,49 @@
+import django.db.models.deletion
+import emails.models
+import froala_editor.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0017_remove_sentemailattachment_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailTemplateVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('subject', models.CharField(max_length=300)),
+                ('body', froala_editor.fields.FroalaField()),
+                ('is_html', models.BooleanField(default=False, editable=False, help_text='Body contains HTML regardless of placeholder values')),
+                ('text_body', models.TextField(blank=True, editable=False, help_text='Plain-text alternative with placeholders kept')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('template', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='versions', to='emails.emailtemplate')),
+            ],
+            options={
+                'ordering': ['template', '-number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sentemail',
+            name='template_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sent_emails', to='emails.emailtemplateversion'),
+        ),
+        # Same text column; only the Python field class changes, so skip SQLite's table rebuild
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='sentemail',
+                    name='body',
+                    field=emails.models.SnapshotBodyField(),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='emailtemplateversion',
+            constraint=models.UniqueConstraint(fields=('template', 'number'), name='templateversion_unique_number'),
+        ),
+    ]
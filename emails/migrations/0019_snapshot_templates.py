@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def snapshot_templates(apps, schema_editor):
+    """Give every template a first version and store unedited email bodies against it"""
+    EmailTemplate = apps.get_model('emails', 'EmailTemplate')
+    EmailTemplateVersion = apps.get_model('emails', 'EmailTemplateVersion')
+    SentEmail = apps.get_model('emails', 'SentEmail')
+    for template in EmailTemplate.objects.iterator():
+        version = EmailTemplateVersion.objects.create(
+            template=template,
+            number=1,
+            subject=template.subject,
+            body=template.body,
+            is_html=template.is_html,
+            text_body=template.text_body,
+        )
+        sent_emails = SentEmail.objects.filter(template=template)
+        # Emails written from an earlier revision keep their full body
+        sent_emails.update(template_version=version)
+        sent_emails.filter(body=template.body).update(body='')
+
+
+def restore_bodies(apps, schema_editor):
+    EmailTemplate = apps.get_model('emails', 'EmailTemplate')
+    EmailTemplateVersion = apps.get_model('emails', 'EmailTemplateVersion')
+    SentEmail = apps.get_model('emails', 'SentEmail')
+    for version in EmailTemplateVersion.objects.order_by('template', 'number').iterator():
+        SentEmail.objects.filter(template_version=version, body='').update(body=version.body)
+        if version.template_id is not None:
+            # Latest version last, leaving its rendering hints on the template
+            EmailTemplate.objects.filter(pk=version.template_id).update(
+                is_html=version.is_html, text_body=version.text_body
+            )
+    SentEmail.objects.update(template_version=None)
+    EmailTemplateVersion.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0018_emailtemplateversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(snapshot_templates, restore_bodies),
+    ]
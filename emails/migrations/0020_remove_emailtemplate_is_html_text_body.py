@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0019_snapshot_templates'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='emailtemplate',
+            name='is_html',
+        ),
+        migrations.RemoveField(
+            model_name='emailtemplate',
+            name='text_body',
+        ),
+    ]
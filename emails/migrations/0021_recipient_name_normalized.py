@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+from emails.utils import chunked, normalize_name
+
+
+def fill_name_normalized(apps, schema_editor):
+    Recipient = apps.get_model('emails', 'Recipient')
+    rows = Recipient.objects.order_by('pk').values_list('pk', 'name').iterator(chunk_size=1000)
+    with schema_editor.connection.cursor() as cursor:
+        for chunk in chunked(rows, 1000):
+            cursor.executemany(
+                f'UPDATE {Recipient._meta.db_table} SET name_normalized = %s WHERE id = %s',
+                [(normalize_name(name), pk) for pk, name in chunk]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0020_remove_emailtemplate_is_html_text_body'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipient',
+            name='recipient_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='recipient',
+            name='name_normalized',
+            field=models.CharField(default='', editable=False, help_text='Casefolded name for case-insensitive prefix search', max_length=600),
+        ),
+        migrations.RunPython(fill_name_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipient',
+            index=models.Index(fields=['name_normalized'], name='recipient_name_norm_idx'),
+        ),
+    ]
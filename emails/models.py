@@ -1,7 +1,14 @@
-from django.db import models
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models.query_utils import DeferredAttribute
 from django.utils import timezone
 from froala_editor.fields import FroalaField
 
+from .rendering import has_static_html, text_skeleton
+from .utils import normalize_email, normalize_name
+
 class BaseModel(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -44,27 +51,98 @@ class EmailTemplate(BaseModel):
     body = FroalaField(help_text="Email body with rich text formatting.\
         Use {{name}}, {{email}}, {{position}}, {{interview_date}}, {{interview_time}}, or any custom variables you've created")
 
-    
-
     def __str__(self):
         return f"{self.name} ({self.template_type.name})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'subject', 'body'} & set(update_fields):
+            self.current_version()
+
+    def current_version(self):
+        """Snapshot of this template's subject and body, created if they changed since the latest one"""
+        latest = self.versions.order_by('-number').first()
+        if latest is not None and latest.subject == self.subject and latest.body == self.body:
+            return latest
+        try:
+            with transaction.atomic():
+                return EmailTemplateVersion.objects.create(
+                    template=self,
+                    number=latest.number + 1 if latest else 1,
+                    subject=self.subject,
+                    body=self.body,
+                )
+        except IntegrityError:
+            # Another save took this number first; compare against its snapshot instead
+            return self.current_version()
+
+
+class EmailTemplateVersion(models.Model):
+    """Immutable snapshot of a template's subject and body that sent emails are written from"""
+    template = models.ForeignKey(EmailTemplate, on_delete=models.SET_NULL, null=True, related_name='versions')
+    number = models.PositiveIntegerField()
+    subject = models.CharField(max_length=300)
+    body = FroalaField()
+    is_html = models.BooleanField(default=False, editable=False, help_text="Body contains HTML regardless of placeholder values")
+    text_body = models.TextField(blank=True, editable=False, help_text="Plain-text alternative with placeholders kept")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['template', '-number']
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'number'], name='templateversion_unique_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} (v{self.number})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Template versions are immutable; create a new version instead.")
+        self.is_html = has_static_html(self.body)
+        self.text_body = text_skeleton(self.body) if self.is_html else ''
+        super().save(*args, **kwargs)
+
 
 class Recipient(BaseModel):
     """Candidate/Recipient information"""
     name = models.CharField(max_length=200)
     email = models.EmailField(unique=True)
+    email_normalized = models.CharField(max_length=254, unique=True, editable=False, help_text="Lowercased email for case-insensitive matching")
+    # Casefolding can turn one character into up to three
+    name_normalized = models.CharField(max_length=600, editable=False, default='', help_text="Casefolded name for case-insensitive prefix search")
     position = models.ForeignKey(Position, on_delete=models.SET_NULL, null=True, blank=True, help_text="Position/role applied for")
     notes = models.TextField(blank=True)
 
-
-
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search for the recipient autocomplete
+            models.Index(fields=['name_normalized'], name='recipient_name_norm_idx'),
+        ]
 
     def __str__(self):
         if self.position:
             return f"{self.name} ({self.email}) - {self.position.name}"
         return f"{self.name} ({self.email})"
 
+    def clean(self):
+        email_normalized = normalize_email(self.email)
+        if Recipient.objects.exclude(pk=self.pk).filter(email_normalized=email_normalized).exists():
+            raise ValidationError({'email': "A recipient with this email already exists (ignoring case)."})
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        self.name_normalized = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if 'email' in update_fields:
+                update_fields = {*update_fields, 'email_normalized'}
+            if 'name' in update_fields:
+                update_fields = {*update_fields, 'name_normalized'}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
 
 class CustomVariable(BaseModel):
     """Custom variables/placeholders for email templates"""
@@ -86,11 +164,70 @@ class CustomVariable(BaseModel):
         return f"{{{{{self.name}}}}}"
 
 
+class Campaign(BaseModel):
+    """A template sent to many recipients at once"""
+    name = models.CharField(max_length=200)
+    template = models.ForeignKey(EmailTemplate, on_delete=models.PROTECT, related_name='campaigns')
+    interview_datetime = models.DateTimeField(null=True, blank=True, help_text="Interview date and time (optional)")
+    custom_variables = models.JSONField(default=dict, blank=True, help_text="Custom variable values used for every email")
+    recipient_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name
+
+
+def blob_path(instance, filename):
+    return f'attachment_blobs/{instance.sha256[:2]}/{instance.sha256}'
+
+
+class AttachmentBlob(models.Model):
+    """Attachment content stored once per SHA-256 digest and shared by every attachment with that content"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_path)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0, help_text="Attachments using this content; unreferenced blobs are removed by gc_attachment_blobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+    @classmethod
+    def store(cls, file_obj):
+        """Return the blob holding ``file_obj``'s content, saving the content only if it is new.
+
+        Uses the digest computed by the hashing upload handlers when present
+        and reads the file to hash it otherwise.
+        """
+        digest = getattr(file_obj, 'sha256', None)
+        if digest is None:
+            sha256 = hashlib.sha256()
+            for chunk in file_obj.chunks():
+                sha256.update(chunk)
+            digest = sha256.hexdigest()
+            file_obj.seek(0)
+
+        blob = cls.objects.filter(sha256=digest).first()
+        if blob is not None:
+            return blob
+        blob = cls(sha256=digest, size=file_obj.size)
+        blob.file.save(digest, file_obj, save=False)
+        try:
+            with transaction.atomic():
+                blob.save()
+        except IntegrityError:
+            # Stored concurrently by another upload of the same content
+            blob.file.delete(save=False)
+            blob = cls.objects.get(sha256=digest)
+        return blob
+
+
 class SentEmailAttachment(BaseModel):
     """Individual attachment for sent emails"""
     sent_email = models.ForeignKey('SentEmail', on_delete=models.CASCADE, related_name='attachments')
-    # ! TODO field validation for size
-    file = models.FileField(upload_to='email_attachments/')
+    blob = models.ForeignKey(AttachmentBlob, on_delete=models.PROTECT, null=True, related_name='attachments')
     filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100)
     size = models.PositiveBigIntegerField()  # Size in bytes
@@ -100,14 +237,44 @@ class SentEmailAttachment(BaseModel):
         return f"{self.filename} ({self.sent_email})"
 
 
+class SnapshotBodyDescriptor(DeferredAttribute):
+    """Reads an empty stored body as the body of the email's template version"""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if not value and instance.template_version_id is not None:
+            return instance.template_version.body
+        return value
+
+    def __set__(self, instance, value):
+        # Being a data descriptor keeps reads coming here rather than to the instance dict
+        instance.__dict__[self.field.attname] = value
+
+
+class SnapshotBodyField(FroalaField):
+    """Email body stored only when it differs from the template version it was written from"""
+    descriptor_class = SnapshotBodyDescriptor
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if model_instance.template_version_id is not None and value == model_instance.template_version.body:
+            return ''
+        return value
+
+
 class SentEmail(BaseModel):
     """Track sent emails"""
     recipient = models.ForeignKey(Recipient, on_delete=models.CASCADE, related_name='sent_emails')
     cc_recipients = models.ManyToManyField(Recipient, blank=True, related_name='cc_sent_emails', help_text="CC recipients (visible to all recipients)")
     bcc_recipients = models.ManyToManyField(Recipient, blank=True, related_name='bcc_sent_emails', help_text="BCC recipients (not visible to main recipient)")
     template = models.ForeignKey(EmailTemplate, on_delete=models.SET_NULL, null=True, blank=True)
+    campaign = models.ForeignKey(Campaign, on_delete=models.SET_NULL, null=True, blank=True, related_name='sent_emails')
+    template_version = models.ForeignKey(EmailTemplateVersion, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='sent_emails')
     subject = models.CharField(max_length=300)
-    body = FroalaField()
+    # Empty in the database while it equals template_version.body; always the effective body when read
+    body = SnapshotBodyField()
     interview_datetime = models.DateTimeField(null=True, blank=True, help_text="Interview date and time (optional)")
     custom_variables = models.JSONField(default=dict, blank=True, help_text="Custom variable values used in this email")
     sent_at = models.DateTimeField(default=timezone.now)
@@ -117,20 +284,92 @@ class SentEmail(BaseModel):
         ('failed', 'Failed'),
     ], default='pending')
     error_message = models.TextField(blank=True)
+    queued_at = models.DateTimeField(null=True, blank=True, help_text="When this email was queued for the send worker")
+    lease_owner = models.CharField(max_length=100, blank=True, help_text="Sender process currently holding this email")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        ordering = ['-sent_at']
+        ordering = ['-sent_at', '-id']
+        indexes = [
+            # Keyset pagination of the admin changelist
+            models.Index(fields=['-sent_at', '-id'], name='sentemail_sent_at_id_idx'),
+            # Status filter and per-recipient links, in changelist order
+            models.Index(fields=['status', '-sent_at', '-id'], name='sentemail_status_sent_at_idx'),
+            models.Index(fields=['recipient', '-sent_at', '-id'], name='sentemail_recipient_sent_idx'),
+            # Send worker: queue scan over queued rows only, and its own leased rows
+            models.Index(
+                fields=['status', 'queued_at', 'id'],
+                condition=models.Q(queued_at__isnull=False),
+                name='sentemail_queue_idx',
+            ),
+            models.Index(fields=['lease_owner', 'status'], name='sentemail_lease_owner_idx'),
+        ]
 
     def __str__(self):
         return f"Email to {self.recipient.name} - {self.sent_at.strftime('%Y-%m-%d %H:%M')}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'sent_at', 'template_id', 'status'} <= set(field_names):
+            # Remember where the email is counted so saving can move it between DeliveryStat rows
+            instance._stat_key = instance.stat_key()
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.template_id is not None and (
+            self.template_version_id is None or self.template_version.template_id != self.template_id
+        ):
+            # Keep the body as read so far, then store it against the new template's snapshot
+            body = self.body
+            self.template_version = self.template.current_version()
+            self.body = body
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'template_version', 'body'}
+        super().save(*args, **kwargs)
+
+    def stat_key(self):
+        """(day, template id, status) this email is counted under in DeliveryStat"""
+        return timezone.localdate(self.sent_at), self.template_id, self.status
+
     def save_attachments(self, files):
         """Save multiple attachments for this email"""
         for file_obj in files:
             SentEmailAttachment.objects.create(
                 sent_email=self,
-                file=file_obj,
+                blob=AttachmentBlob.store(file_obj),
                 filename=file_obj.name,
                 content_type=file_obj.content_type,
                 size=file_obj.size
             )
+
+
+
+class DeliveryStat(models.Model):
+    """Number of sent emails per day, template and status, kept in step with SentEmail"""
+    day = models.DateField()
+    template = models.ForeignKey(EmailTemplate, on_delete=models.CASCADE, null=True, blank=True, related_name='delivery_stats')
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'Delivery statistic'
+        verbose_name_plural = 'Delivery statistics'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'template', 'status'], name='deliverystat_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.template_id} {self.status}: {self.count}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket state shared by every process sending through one email configuration"""
+    key = models.CharField(max_length=255, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f} tokens"
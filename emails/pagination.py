@@ -0,0 +1,109 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that reuses recent COUNT(*) results for the same query"""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        sql, params = query.sql_with_params()
+        key = 'changelist-count:' + hashlib.sha1(f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.ADMIN_CHANGELIST_COUNT_TTL)
+        return count
+
+
+def encode_cursor(obj, field):
+    return f'{getattr(obj, field).isoformat()}|{obj.pk}'
+
+
+def decode_cursor(value):
+    """``(timestamp, pk)`` from an ``encode_cursor`` value, or None if it is missing or malformed"""
+    timestamp, _, pk = (value or '').rpartition('|')
+    try:
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if timestamp is None:
+        return None
+    return timestamp, pk
+
+
+class KeysetChangeList(ChangeList):
+    """Changelist paginating by ``(keyset_field, pk)`` instead of OFFSET.
+
+    Used for the default descending ordering only; sorting by a column,
+    numbered page links and "show all" fall back to regular pagination.
+    Pages are reached through ``after``/``before`` cursors, so deep pages
+    cost the same index range scan as the first one.
+    """
+    keyset_field = 'sent_at'
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(AFTER_VAR, None)
+        lookup_params.pop(BEFORE_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if any(var in request.GET for var in (ORDER_VAR, PAGE_VAR, ALL_VAR)):
+            self.keyset = False
+            return super().get_results(request)
+
+        self.keyset = True
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.result_count > self.list_per_page
+
+        field = self.keyset_field
+        queryset = self.queryset.order_by(f'-{field}', '-pk')
+        after = decode_cursor(request.GET.get(AFTER_VAR))
+        before = decode_cursor(request.GET.get(BEFORE_VAR))
+        if after:
+            value, pk = after
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        elif before:
+            value, pk = before
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            queryset = queryset.order_by(field, 'pk')
+
+        rows = list(queryset[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if before:
+            rows.reverse()
+        self.result_list = rows
+
+        has_older = has_more if not before else True
+        has_newer = bool(after) or (bool(before) and has_more)
+        remove = [AFTER_VAR, BEFORE_VAR, PAGE_VAR]
+        self.first_url = self.get_query_string(remove=remove) if has_newer else None
+        self.newer_url = (
+            self.get_query_string({BEFORE_VAR: encode_cursor(rows[0], field)}, remove)
+            if has_newer and rows else None
+        )
+        self.older_url = (
+            self.get_query_string({AFTER_VAR: encode_cursor(rows[-1], field)}, remove)
+            if has_older and rows else None
+        )
@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RateLimitBucket
+
+# Longest sleep between heartbeats while waiting for tokens
+WAIT_SLICE_SECONDS = 5
+
+
+def configuration_key():
+    """Identify the active des email configuration the quotas apply to"""
+    from des.models import DynamicEmailConfiguration
+    configuration = DynamicEmailConfiguration.get_solo()
+    return f"{configuration.host}:{configuration.port}:{configuration.username}"
+
+
+class RateLimiter:
+    """Token bucket limiter for outgoing mail, shared across processes through the database.
+
+    Each limit is a bucket refilled continuously at ``limit / period`` tokens per
+    second. Messages cost one token from the message bucket and one token per
+    To/CC/BCC address from the recipient bucket, and are only sent when every
+    bucket can pay.
+
+    Buckets are updated in a transaction that first locks them with
+    ``select_for_update``. That is a no-op on SQLite, where the budget is only
+    shared correctly because the connection uses IMMEDIATE transactions
+    (``transaction_mode`` in settings): the write lock is taken when the
+    transaction starts, so no two processes read the same token count.
+    """
+
+    def __init__(self, key, messages_per_minute=0, recipients_per_hour=0, burst=1):
+        self.limits = []  # (bucket key, tokens per second, uses recipient count)
+        if messages_per_minute:
+            self.limits.append((f"{key}:messages", messages_per_minute / 60, False))
+        if recipients_per_hour:
+            self.limits.append((f"{key}:recipients", recipients_per_hour / 3600, True))
+        self.burst = burst
+
+    def try_acquire(self, recipients):
+        """Take tokens for one message if available, otherwise return seconds to wait"""
+        now = timezone.now()
+        # Serialized by the row locks, or on SQLite by the IMMEDIATE transaction's write lock
+        with transaction.atomic():
+            buckets = []
+            wait = 0.0
+            for key, rate, per_recipient in self.limits:
+                cost = recipients if per_recipient else 1
+                capacity = max(self.burst, cost)
+                bucket, _ = RateLimitBucket.objects.select_for_update().get_or_create(
+                    key=key, defaults={'tokens': capacity, 'updated_at': now}
+                )
+                elapsed = max((now - bucket.updated_at).total_seconds(), 0.0)
+                bucket.tokens = min(capacity, bucket.tokens + elapsed * rate)
+                bucket.updated_at = now
+                if bucket.tokens < cost:
+                    wait = max(wait, (cost - bucket.tokens) / rate)
+                buckets.append((bucket, cost))
+
+            if wait:
+                return wait
+            for bucket, cost in buckets:
+                bucket.tokens -= cost
+                bucket.save(update_fields=['tokens', 'updated_at'])
+        return 0.0
+
+    def acquire(self, recipients, stop_event=None, heartbeat=None):
+        """Block until a message to ``recipients`` addresses may be sent.
+
+        Waits in slices of at most ``WAIT_SLICE_SECONDS``, calling
+        ``heartbeat`` after each one, so long waits can keep a lease alive.
+        Returns False if ``stop_event`` was set while waiting.
+        """
+        while True:
+            wait = self.try_acquire(recipients)
+            if not wait:
+                return True
+            deadline = time.monotonic() + wait
+            while (remaining := deadline - time.monotonic()) > 0:
+                step = min(remaining, WAIT_SLICE_SECONDS)
+                if stop_event is None:
+                    time.sleep(step)
+                elif stop_event.wait(step):
+                    return False
+                if heartbeat is not None:
+                    heartbeat()
+
+
+def get_rate_limiter():
+    """Return the limiter for the active email configuration, or None when no quota is set"""
+    if not (settings.EMAIL_RATE_LIMIT_MESSAGES_PER_MINUTE or settings.EMAIL_RATE_LIMIT_RECIPIENTS_PER_HOUR):
+        return None
+    return RateLimiter(
+        configuration_key(),
+        messages_per_minute=settings.EMAIL_RATE_LIMIT_MESSAGES_PER_MINUTE,
+        recipients_per_hour=settings.EMAIL_RATE_LIMIT_RECIPIENTS_PER_HOUR,
+        burst=settings.EMAIL_RATE_LIMIT_BURST,
+    )
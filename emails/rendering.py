@@ -0,0 +1,147 @@
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+PLACEHOLDER_RE = re.compile(r'\{\{([^{}]*)\}\}')
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+# Values containing these could change how a filled body is tag-stripped
+MARKUP_CHARS_RE = re.compile(r'[<>&"\'{}]')
+# Placeholders opening a tag or entity name decide whether it is markup at all
+MARKUP_NAME_SLOT_RE = re.compile(r'(?:<[/!?]?[\w:-]*|&#?\w*)\{\{')
+
+
+def legacy_render(text, context):
+    """Replace placeholders one context key at a time"""
+    for key, value in context.items():
+        text = text.replace(f'{{{{{key}}}}}', str(value))
+    return text
+
+
+def _has_braces(text):
+    return '{' in text or '}' in text
+
+
+class CompiledTemplate:
+    """Placeholder text parsed once into literal and slot segments.
+
+    ``literals`` always has one more item than ``slots``; rendering interleaves
+    them. Unknown slots are written back unchanged.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.literals = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.slots.append((match.group(1), match.group(0)))
+            position = match.end()
+        self.literals.append(source[position:])
+        # Stray braces around slots could combine with substituted values into
+        # new placeholders under sequential replacement; keep that behavior exact.
+        self.single_pass = not any(_has_braces(literal) for literal in self.literals)
+
+    def render(self, context):
+        """Render in one pass, matching ``legacy_render`` output exactly"""
+        values = {key: str(value) for key, value in context.items()}
+        if not self.single_pass or any(_has_braces(key) or _has_braces(value) for key, value in values.items()):
+            return legacy_render(self.source, context)
+
+        parts = [self.literals[0]]
+        for (key, placeholder), literal in zip(self.slots, self.literals[1:]):
+            parts.append(values.get(key, placeholder))
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class TemplateCache:
+    """Thread-safe LRU cache of compiled templates"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, source):
+        """Return the compiled form of ``source``, compiling it on a miss"""
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        compiled = CompiledTemplate(source)
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+template_cache = TemplateCache(settings.EMAIL_TEMPLATE_CACHE_SIZE)
+
+
+def compile_field(obj, field):
+    """Compile a SentEmail's subject or body, caching text taken unchanged from its template version"""
+    text = getattr(obj, field)
+    version = obj.template_version
+    if version is not None and getattr(version, field) == text:
+        return template_cache.get((version.pk, field), text)
+    return CompiledTemplate(text)
+
+
+def has_static_html(body):
+    """Whether ``body`` contains an HTML tag whatever its placeholders are filled with"""
+    return bool(HTML_TAG_RE.search(PLACEHOLDER_RE.sub('', body)))
+
+
+def text_skeleton(body):
+    """Tag-stripped ``body`` with its placeholders kept, for filling per recipient.
+
+    Returns an empty string when filling the skeleton would not give the same
+    text as stripping the filled body, checked by filling both with sentinels.
+    """
+    if MARKUP_NAME_SLOT_RE.search(body):
+        return ''
+    skeleton = strip_tags(body)
+    if '<' in skeleton:
+        # Leftover unterminated markup could be closed by a filled value
+        return ''
+    keys = {key for key, _ in CompiledTemplate(body).slots}
+    for sentinel in ('slot{}x', ' slot {} ', ''):
+        values = {key: sentinel.format(index) for index, key in enumerate(keys)}
+        if strip_tags(legacy_render(body, values)) != legacy_render(skeleton, values):
+            return ''
+    return skeleton
+
+
+def is_markup_free(context):
+    return not any(MARKUP_CHARS_RE.search(str(key)) or MARKUP_CHARS_RE.search(str(value))
+                   for key, value in context.items())
+
+
+def render_text_alternative(obj, html, context):
+    """Plain-text version of a rendered HTML body.
+
+    Bodies taken unchanged from a template version fill its precomputed skeleton
+    instead of stripping the whole document again.
+    """
+    version = obj.template_version
+    if version is not None and version.text_body and version.body == obj.body and is_markup_free(context):
+        return template_cache.get((version.pk, 'text_body'), version.text_body).render(context)
+    return strip_tags(html)
+
+
+def is_html_body(obj, body, context):
+    """Whether a rendered body should be sent as HTML"""
+    version = obj.template_version
+    if version is not None and version.is_html and version.body == obj.body and is_markup_free(context):
+        return True
+    return bool(HTML_TAG_RE.search(body))
@@ -0,0 +1,62 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+from .utils import chunked
+
+# SQLite FTS5 table over SentEmail subjects and tag-stripped bodies, keyed by rowid = SentEmail id
+FTS_TABLE = 'emails_sentemail_fts'
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_query(term):
+    """FTS5 query matching every word of ``term`` as a prefix, or '' if it has no words"""
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(term))
+
+
+def matching_ids(term):
+    """Subquery of SentEmail ids whose subject or body match ``term``"""
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match_query(term)])
+
+
+def index_emails(sent_emails):
+    """Add or refresh index entries for the given SentEmails"""
+    if not is_available():
+        return
+    rows = [(obj.pk, obj.subject, strip_tags(obj.body)) for obj in sent_emails]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, subject, body) VALUES (%s, %s, %s)', rows
+            )
+
+
+def remove_emails(pks):
+    """Drop index entries for the given SentEmail ids"""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index(chunk_size=1000):
+    """Recreate the whole index from the SentEmail table, returning the number of indexed rows"""
+    from .models import SentEmail
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    total = 0
+    rows = (
+        SentEmail.objects.only('pk', 'subject', 'body', 'template_version__body')
+        .select_related('template_version').order_by().iterator(chunk_size=chunk_size)
+    )
+    for chunk in chunked(rows, chunk_size):
+        index_emails(chunk)
+        total += len(chunk)
+    return total
@@ -0,0 +1,134 @@
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SentEmail
+from .stats import update_tracked
+
+
+def unleased(now=None):
+    """Filter for emails no worker currently holds a lease on"""
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now or timezone.now())
+
+
+def enqueue(queryset):
+    """Queue the given emails for the send worker, skipping already sent and in-flight ones.
+
+    Returns the number of emails queued.
+    """
+    return update_tracked(
+        queryset.exclude(status='success').filter(unleased()),
+        status='pending',
+        queued_at=timezone.now(),
+        error_message='',
+        lease_owner='',
+        lease_expires_at=None,
+    )
+
+
+def queued_emails():
+    """Emails waiting for the send worker, oldest first"""
+    return SentEmail.objects.filter(status='pending', queued_at__isnull=False).order_by('queued_at', 'pk')
+
+
+class Lease:
+    """Exclusive, expiring claim on SentEmails for one sender process.
+
+    Rows are claimed with a single conditional UPDATE, so concurrent workers
+    (on any node sharing the database) never claim the same row. Leases of a
+    crashed worker expire and the rows become claimable again. Status is only
+    written back for rows still leased by this owner, so every email moves out
+    of ``pending`` exactly once.
+    """
+
+    def __init__(self, owner=None, duration=None):
+        if duration is None:
+            duration = settings.EMAIL_SEND_LEASE_SECONDS
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.duration = timedelta(seconds=duration)
+        self.renewed_at = time.monotonic()
+
+    def claim(self, queryset, limit=None):
+        """Lease up to ``limit`` unleased emails from ``queryset`` and return their ids in queue order"""
+        now = timezone.now()
+        candidates = queryset.filter(unleased(now)).values_list('pk', flat=True)
+        if limit is not None:
+            candidates = candidates[:limit]
+        with transaction.atomic():
+            # Resolved once: update_tracked repeats the queryset's filters in each UPDATE, and a
+            # sliced subquery there would pick a fresh ``limit`` rows every time
+            update_tracked(
+                SentEmail.objects.filter(unleased(now), pk__in=list(candidates)).exclude(status='success'),
+                status='pending',
+                lease_owner=self.owner,
+                lease_expires_at=now + self.duration,
+            )
+        self.renewed_at = time.monotonic()
+        return list(queryset.filter(lease_owner=self.owner, status='pending').values_list('pk', flat=True))
+
+    def held(self):
+        return SentEmail.objects.filter(lease_owner=self.owner, status='pending')
+
+    def renew(self):
+        """Extend the lease on every email this owner still holds"""
+        self.held().update(lease_expires_at=timezone.now() + self.duration)
+        self.renewed_at = time.monotonic()
+
+    def renew_if_due(self):
+        """Renew once a third of the lease duration has passed"""
+        if time.monotonic() - self.renewed_at > self.duration.total_seconds() / 3:
+            self.renew()
+
+    def release(self):
+        """Give back unprocessed emails so another worker can pick them up now"""
+        return self.held().update(lease_owner='', lease_expires_at=None)
+
+
+def record_result(obj, success, error_msg):
+    """Apply a send result to an email without saving it"""
+    if success:
+        obj.status = 'success'
+        obj.sent_at = timezone.now()
+        obj.error_message = ''
+    else:
+        obj.status = 'failed'
+        obj.error_message = error_msg or ''
+
+
+def write_results(results, lease):
+    """Persist (obj, success, error_message) send results and release their lease.
+
+    Uses one UPDATE for all successes and one per distinct error message
+    (split further per DeliveryStat key), each limited to rows still held by
+    ``lease``, all in a single transaction. Returns the number of rows
+    written.
+    """
+    failed = defaultdict(list)
+    sent = []
+    for obj, success, error_msg in results:
+        record_result(obj, success, error_msg)
+        if success:
+            sent.append(obj.pk)
+        else:
+            failed[obj.error_message].append(obj.pk)
+
+    held = SentEmail.objects.filter(lease_owner=lease.owner, status='pending')
+    cleared = {'lease_owner': '', 'lease_expires_at': None}
+    written = 0
+    # One write transaction per batch, so the database write lock is taken and committed once
+    with transaction.atomic():
+        if sent:
+            written += update_tracked(
+                held.filter(pk__in=sent), status='success', sent_at=timezone.now(), error_message='', **cleared
+            )
+        for error_msg, pks in failed.items():
+            written += update_tracked(held.filter(pk__in=pks), status='failed', error_message=error_msg, **cleared)
+    return written
@@ -0,0 +1,338 @@
+import logging
+import mimetypes
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+
+from .ratelimit import get_rate_limiter
+from .rendering import compile_field, is_html_body, render_text_alternative
+from .utils import normalize_email
+from .variables import variable_registry
+
+logger = logging.getLogger(__name__)
+
+
+def build_context(obj):
+    """Build the placeholder context for a sent email"""
+    context = {
+        'name': obj.recipient.name,
+        'email': obj.recipient.email,
+        'position': obj.recipient.position.name if obj.recipient.position else 'N/A',
+    }
+
+    # Add interview date/time if provided
+    if obj.interview_datetime:
+        context['interview_datetime'] = obj.interview_datetime.strftime('%B %d, %Y at %I:%M %p')
+
+    # Add custom variable defaults, overridden by the custom_variables JSON field
+    context.update(variable_registry.defaults())
+    if obj.custom_variables:
+        context.update(obj.custom_variables)
+    return context
+
+
+def unique_addresses(addresses, seen):
+    """``addresses`` without case-insensitive repeats or any already in ``seen``, which is updated"""
+    unique = []
+    for address in addresses:
+        key = normalize_email(address)
+        if key not in seen:
+            seen.add(key)
+            unique.append(address)
+    return unique
+
+
+class SendContext:
+    """Everything needed to build one message, read once from a SentEmail.
+
+    Related rows are read through ``.all()`` so relations prefetched by
+    ``emails.loader`` are used instead of issuing queries per email.
+    """
+
+    def __init__(self, obj):
+        self.sent_email = obj
+        self.placeholders = build_context(obj)
+        # Each address is used once, in the most visible field it appears in
+        seen = set()
+        self.to = unique_addresses([obj.recipient.email], seen)
+        self.cc = unique_addresses([recipient.email for recipient in obj.cc_recipients.all()], seen)
+        self.bcc = unique_addresses([recipient.email for recipient in obj.bcc_recipients.all()], seen)
+        self.attachments = [attachment for attachment in obj.attachments.all() if attachment.blob_id]
+
+
+def read_attachment(attachment):
+    """``(filename, content, mimetype)`` of a SentEmailAttachment, as taken by ``EmailMessage.attach``"""
+    mimetype = attachment.content_type or mimetypes.guess_type(attachment.filename)[0] or 'application/octet-stream'
+    with attachment.blob.file.open('rb') as f:
+        return attachment.filename, f.read(), mimetype
+
+
+class AttachmentCache:
+    """Encoded MIME parts shared by the messages of one batch.
+
+    Attachments sharing a blob (and filename and type) are read and encoded
+    once and the part is attached to every message. Cached parts are evicted
+    least recently used once their encoded size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = settings.EMAIL_ATTACHMENT_CACHE_BYTES
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._parts = OrderedDict()
+
+    def get_part(self, attachment):
+        key = (attachment.blob.sha256, attachment.filename, attachment.content_type)
+        cached = self._parts.get(key)
+        if cached is not None:
+            self._parts.move_to_end(key)
+            return cached[0]
+
+        # Let Django decode and encode the content exactly as attach() does; with no body,
+        # the attachment is the last part of the built message
+        builder = EmailMessage()
+        builder.attach(*read_attachment(attachment))
+        part = builder.message().get_payload()[-1]
+        size = len(part.as_bytes())
+        if size <= self.max_bytes:
+            self._parts[key] = (part, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._parts.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return part
+
+
+def build_message(item, attachment_cache=None):
+    """Build the EmailMessage for a sent email with variable replacement and attachments.
+
+    ``item`` is a SentEmail or a prepared ``SendContext``. Pass an
+    ``AttachmentCache`` to share encoded attachments across a batch.
+    """
+    send_context = item if isinstance(item, SendContext) else SendContext(item)
+    obj = send_context.sent_email
+    context = send_context.placeholders
+
+    # Replace placeholders in subject and body
+    subject = compile_field(obj, 'subject').render(context)
+    body = compile_field(obj, 'body').render(context)
+
+    # Check if body contains HTML
+    has_html = is_html_body(obj, body, context)
+
+    if has_html:
+        # Send as HTML email
+        text_content = render_text_alternative(obj, body, context)
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=send_context.to,
+        )
+        email.attach_alternative(body, "text/html")
+    else:
+        # Send as plain text email
+        email = EmailMessage(
+            subject=subject,
+            body=body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=send_context.to,
+        )
+
+    # Add CC and BCC recipients if any
+    if send_context.cc:
+        email.cc = send_context.cc
+    if send_context.bcc:
+        email.bcc = send_context.bcc
+
+    # Attach files if any
+    for attachment in send_context.attachments:
+        if attachment_cache is None:
+            email.attach(*read_attachment(attachment))
+        else:
+            email.attach(attachment_cache.get_part(attachment))
+
+    return email
+
+
+class ConnectionSession:
+    """Send many messages over one email backend connection.
+
+    The backend is created up front, so the session can be handed to another
+    thread. Its connection is opened lazily, recycled after ``max_messages``
+    messages and reopened once when the server drops the session mid-batch.
+    """
+
+    def __init__(self, max_messages=None):
+        if max_messages is None:
+            max_messages = settings.EMAIL_MAX_MESSAGES_PER_CONNECTION
+        self.max_messages = max_messages
+        self.connection = get_connection(fail_silently=False)
+        self.is_open = False
+        self.sent_on_connection = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        self.connection.open()
+        self.is_open = True
+        self.sent_on_connection = 0
+
+    def close(self):
+        if self.is_open:
+            try:
+                self.connection.close()
+            except Exception:
+                logger.warning("Error closing email connection", exc_info=True)
+            self.is_open = False
+
+    def reconnect(self):
+        self.close()
+        self.open()
+
+    def send(self, message):
+        """Send one message, returning the number of messages sent"""
+        if not self.is_open:
+            self.open()
+        elif self.max_messages and self.sent_on_connection >= self.max_messages:
+            self.reconnect()
+
+        message.connection = self.connection
+        try:
+            sent = self.connection.send_messages([message])
+        except smtplib.SMTPServerDisconnected:
+            logger.info("Email server closed the connection, reconnecting")
+            self.reconnect()
+            sent = self.connection.send_messages([message])
+        self.sent_on_connection += 1
+        return sent
+
+
+class SendReport:
+    """Outcome of a batch send, in the order the emails were given"""
+
+    def __init__(self, results, elapsed):
+        self.results = results  # list of (obj, success, error_message)
+        self.elapsed = elapsed
+
+    @property
+    def sent(self):
+        return sum(1 for _, success, _ in self.results if success)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.sent
+
+    @property
+    def rate(self):
+        """Messages per second"""
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f"{self.sent} sent, {self.failed} failed in {self.elapsed:.1f}s ({self.rate:.1f} msg/s)"
+
+
+class SendInterrupted(Exception):
+    """Raised by ``send_batch`` when the calling thread fails after handing messages to the pool.
+
+    ``report`` holds the outcome of every message already handed off, which the
+    pool still finished sending, so callers can record them before retrying.
+    """
+
+    def __init__(self, report):
+        super().__init__(f"Batch send interrupted after {len(report.results)} email(s)")
+        self.report = report
+
+
+def send_batch(items, concurrency=None, max_per_connection=None, stop_event=None, heartbeat=None):
+    """Send a batch of emails across a thread pool of persistent connections.
+
+    ``items`` is any iterable of SentEmail or ``SendContext`` objects and is
+    consumed lazily. Messages are built in the calling thread, so worker
+    threads never touch the database, and each worker reuses one
+    ``ConnectionSession``. Building stays a few messages ahead of the pool and
+    attachments are encoded once per batch, which keeps memory bounded for
+    batches of large files. Sends are paced by the configured rate limiter
+    before being handed to the pool. A failure only affects its own email.
+    Emails skipped because ``stop_event`` was set are left out of the report
+    so they can be retried later. ``heartbeat`` is called from the calling
+    thread after each message is handed off and while waiting for the rate
+    limiter, e.g. to renew a lease. If the calling thread raises, the messages
+    already handed off are still sent and ``SendInterrupted`` carries their
+    outcomes.
+    """
+    if concurrency is None:
+        concurrency = settings.EMAIL_SEND_CONCURRENCY
+    started = time.monotonic()
+    limiter = get_rate_limiter()
+    attachment_cache = AttachmentCache()
+
+    sessions = [ConnectionSession(max_per_connection) for _ in range(max(1, concurrency))]
+    idle_sessions = queue.SimpleQueue()
+    for session in sessions:
+        idle_sessions.put(session)
+    in_flight = threading.BoundedSemaphore(2 * len(sessions))
+
+    def deliver(message):
+        if stop_event is not None and stop_event.is_set():
+            return None
+        session = idle_sessions.get()
+        try:
+            session.send(message)
+            return True, None
+        except Exception as e:
+            logger.warning("Email sending error: %s", e)
+            return False, str(e)
+        finally:
+            idle_sessions.put(session)
+
+    pending = []  # (SentEmail, future or a ready (success, error_message) outcome)
+
+    def outcomes():
+        results = []
+        for obj, outcome in pending:
+            if not isinstance(outcome, tuple):
+                outcome = outcome.result()
+            if outcome is not None:
+                results.append((obj, *outcome))
+        return results
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            for item in items:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                obj = item.sent_email if isinstance(item, SendContext) else item
+                try:
+                    message = build_message(item, attachment_cache)
+                except Exception as e:
+                    logger.exception("Email building error for SentEmail %s", obj.pk)
+                    pending.append((obj, (False, str(e))))
+                    continue
+                if limiter is not None and not limiter.acquire(len(message.recipients()), stop_event, heartbeat):
+                    break
+                in_flight.acquire()
+                future = executor.submit(deliver, message)
+                future.add_done_callback(lambda _: in_flight.release())
+                pending.append((obj, future))
+                if heartbeat is not None:
+                    heartbeat()
+    except Exception as e:
+        # Leaving the executor waited for the handed-off messages, which were sent
+        raise SendInterrupted(SendReport(outcomes(), time.monotonic() - started)) from e
+    finally:
+        for session in sessions:
+            session.close()
+
+    return SendReport(outcomes(), time.monotonic() - started)
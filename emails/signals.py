@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import search, stats
+from .models import AttachmentBlob, CustomVariable, EmailTemplate, SentEmail, SentEmailAttachment
+from .variables import variable_registry
+
+
+@receiver(post_save, sender=SentEmail)
+def index_sent_email(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text index in sync when subject or body may have changed"""
+    if update_fields is not None and not {'subject', 'body'} & set(update_fields):
+        return
+    search.index_emails([instance])
+
+
+@receiver(post_delete, sender=SentEmail)
+def unindex_sent_email(sender, instance, **kwargs):
+    search.remove_emails([instance.pk])
+
+
+@receiver(pre_save, sender=SentEmail)
+def load_stat_key(sender, instance, raw=False, **kwargs):
+    """Look up where an email is counted when it was not loaded with its stat fields"""
+    if raw or instance._state.adding or hasattr(instance, '_stat_key'):
+        return
+    stored = SentEmail.objects.filter(pk=instance.pk).only('sent_at', 'template_id', 'status').first()
+    instance._stat_key = stored.stat_key() if stored else None
+
+
+@receiver(post_save, sender=SentEmail)
+def count_sent_email(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_key = instance.stat_key()
+    stats.move(None if created else instance._stat_key, new_key)
+    instance._stat_key = new_key
+
+
+@receiver(post_delete, sender=SentEmail)
+def uncount_sent_email(sender, instance, **kwargs):
+    stats.move(getattr(instance, '_stat_key', None) or instance.stat_key(), None)
+
+
+@receiver(pre_delete, sender=EmailTemplate)
+def fold_template_stats(sender, instance, **kwargs):
+    """Emails keep existing without their deleted template, so move their counts with them"""
+    stats.fold_template(instance.pk)
+
+
+@receiver(post_save, sender=CustomVariable)
+@receiver(post_delete, sender=CustomVariable)
+def invalidate_custom_variables(sender, **kwargs):
+    # After commit, so no process reloads the defaults before the change is visible
+    transaction.on_commit(variable_registry.invalidate)
+
+
+def add_blob_references(blob_id, change):
+    if blob_id is not None:
+        AttachmentBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + change)
+
+
+@receiver(pre_save, sender=SentEmailAttachment)
+def load_previous_blob(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_blob_id = (
+        SentEmailAttachment.objects.filter(pk=instance.pk).values_list('blob_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=SentEmailAttachment)
+def reference_blob(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_blob_id = None if created else instance._previous_blob_id
+    if previous_blob_id != instance.blob_id:
+        add_blob_references(instance.blob_id, 1)
+        add_blob_references(previous_blob_id, -1)
+
+
+@receiver(post_delete, sender=SentEmailAttachment)
+def dereference_blob(sender, instance, **kwargs):
+    add_blob_references(instance.blob_id, -1)
@@ -0,0 +1,136 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DeliveryStat, SentEmail
+from .utils import chunked
+
+# SentEmail fields that decide which DeliveryStat row an email is counted in
+STAT_FIELDS = {'sent_at', 'template', 'template_id', 'status'}
+# Rows per UPDATE in update_tracked, well below SQLite's bound parameter limit
+UPDATE_CHUNK_SIZE = 500
+
+
+def apply_deltas(deltas):
+    """Add ``{(day, template_id, status): change}`` to the DeliveryStat counts"""
+    with transaction.atomic():
+        for (day, template_id, status), change in deltas.items():
+            if not change:
+                continue
+            rows = DeliveryStat.objects.filter(day=day, template_id=template_id, status=status)
+            if rows.update(count=F('count') + change):
+                continue
+            try:
+                with transaction.atomic():
+                    DeliveryStat.objects.create(day=day, template_id=template_id, status=status, count=change)
+            except IntegrityError:
+                # Created concurrently since the update above
+                rows.update(count=F('count') + change)
+
+
+def count_new(sent_emails):
+    """Count freshly created SentEmails, e.g. after ``bulk_create``"""
+    apply_deltas(Counter(obj.stat_key() for obj in sent_emails))
+
+
+def move(old_key, new_key):
+    """Move one email from ``old_key`` to ``new_key``; either may be None for creation or deletion"""
+    if old_key == new_key:
+        return
+    deltas = Counter()
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    apply_deltas(deltas)
+
+
+def raw_counts(queryset=None):
+    """``(day, template_id, status) -> count`` grouped from the SentEmail table itself"""
+    if queryset is None:
+        queryset = SentEmail.objects.all()
+    rows = (
+        queryset.order_by()
+        .annotate(day=TruncDate('sent_at'))
+        .values_list('day', 'template_id', 'status')
+        .annotate(total=Count('pk'))
+    )
+    return {(day, template_id, status): total for day, template_id, status, total in rows}
+
+
+def update_tracked(queryset, **changes):
+    """``queryset.update(**changes)`` that keeps DeliveryStat in step, returning the number of updated rows.
+
+    The rows and their stat keys are read first, then updated one stat key at
+    a time, each UPDATE limited to that key's rows and still filtering on the
+    key. A row moved by an earlier UPDATE is never written again, so every
+    count moved is exactly the number of rows written.
+    """
+    if not STAT_FIELDS & set(changes):
+        return queryset.update(**changes)
+
+    new_day = timezone.localdate(changes['sent_at']) if 'sent_at' in changes else None
+    new_template_id = changes.get('template_id', getattr(changes.get('template'), 'pk', None))
+    deltas = Counter()
+    updated = 0
+    with transaction.atomic():
+        keyed = defaultdict(list)
+        rows = queryset.order_by().annotate(day=TruncDate('sent_at')).values_list('pk', 'day', 'template_id', 'status')
+        for pk, day, template_id, status in rows:
+            keyed[(day, template_id, status)].append(pk)
+        for (day, template_id, status), pks in keyed.items():
+            written = 0
+            for chunk in chunked(pks, UPDATE_CHUNK_SIZE):
+                written += queryset.filter(
+                    pk__in=chunk, sent_at__date=day, template_id=template_id, status=status
+                ).update(**changes)
+            if not written:
+                continue
+            new_key = (
+                new_day or day,
+                new_template_id if {'template', 'template_id'} & set(changes) else template_id,
+                changes.get('status', status),
+            )
+            deltas[(day, template_id, status)] -= written
+            deltas[new_key] += written
+            updated += written
+        apply_deltas(deltas)
+    return updated
+
+
+def fold_template(template_id):
+    """Count a template's emails under no template, as deleting it leaves them"""
+    deltas = Counter()
+    for day, status, count in DeliveryStat.objects.filter(template_id=template_id).values_list('day', 'status', 'count'):
+        deltas[(day, None, status)] += count
+        deltas[(day, template_id, status)] -= count
+    apply_deltas(deltas)
+
+
+def rebuild():
+    """Recompute every DeliveryStat row from the SentEmail table, returning the number of rows"""
+    with transaction.atomic():
+        DeliveryStat.objects.all().delete()
+        DeliveryStat.objects.bulk_create([
+            DeliveryStat(day=day, template_id=template_id, status=status, count=count)
+            for (day, template_id, status), count in raw_counts().items()
+        ])
+    return DeliveryStat.objects.count()
+
+
+def differences():
+    """Keys whose rollup count disagrees with the SentEmail table, as ``{key: (rollup, actual)}``"""
+    rollup = {
+        (day, template_id, status): total
+        for day, template_id, status, total in DeliveryStat.objects.order_by()
+        .values_list('day', 'template_id', 'status').annotate(total=Sum('count'))
+    }
+    actual = raw_counts()
+    return {
+        key: (rollup.get(key, 0), actual.get(key, 0))
+        for key in rollup.keys() | actual.keys()
+        if rollup.get(key, 0) != actual.get(key, 0)
+    }
@@ -0,0 +1,460 @@
+import io
+import random
+import re
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from . import ratelimit, stats
+from .admin import prefix_range
+from .archive import delete_sent_emails
+from .rendering import CompiledTemplate, is_markup_free, legacy_render, text_skeleton
+from .models import AttachmentBlob, DeliveryStat, EmailTemplate, Position, Recipient, SentEmail, SentEmailAttachment, TemplateType
+from .sending import AttachmentCache, build_message
+from .send_queue import Lease, enqueue, queued_emails, unleased, write_results
+
+# Without a cache the paginator runs its COUNT on every request
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def seed(count):
+    """``count`` recipients, each with one sent email that has a CC, a BCC and an attachment"""
+    position = Position.objects.create(name='Engineer')
+    template_type = TemplateType.objects.create(name='Interview')
+    template = EmailTemplate.objects.create(
+        name='Interview', template_type=template_type, subject='Interview', body='Hello {name}'
+    )
+    for i in range(count):
+        recipient = Recipient.objects.create(name=f'Person {i}', email=f'person{i}@example.com', position=position)
+        sent_email = SentEmail.objects.create(
+            recipient=recipient, template=template, subject=f'Interview {i}', body=f'Hello Person {i}'
+        )
+        sent_email.cc_recipients.add(recipient)
+        sent_email.bcc_recipients.add(recipient)
+        SentEmailAttachment.objects.create(
+            sent_email=sent_email, filename='cv.pdf', content_type='application/pdf', size=100
+        )
+
+
+@override_settings(CACHES=NO_CACHE)
+class ChangelistQueryBudgetTests(TestCase):
+    """Changelists run a fixed number of queries, however many rows a page shows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(30)
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertQueriesPerPage(self, model, expected, query=''):
+        url = reverse(f'admin:emails_{model._meta.model_name}_changelist') + query
+        for page_size in (5, 25):
+            with self.subTest(page_size=page_size), \
+                    mock.patch.object(admin.site._registry[model], 'list_per_page', page_size):
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context['cl'].result_list), page_size)
+
+    # Session, user, template/type/campaign filter choices, COUNT and the page
+    def test_sent_email_changelist(self):
+        self.assertQueriesPerPage(SentEmail, 7)
+
+    def test_sent_email_changelist_sorted_by_column(self):
+        self.assertQueriesPerPage(SentEmail, 7, '?o=2')
+
+    # Session, user, position filter choices, filtered and full COUNT and the page
+    def test_recipient_changelist(self):
+        self.assertQueriesPerPage(Recipient, 6)
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return '\n'.join(row[-1] for row in cursor.fetchall())
+
+
+@override_settings(CACHES=NO_CACHE)
+class QueryPlanTests(TestCase):
+    """Hot SentEmail queries are answered from their index, never by scanning the table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(30)
+        enqueue(SentEmail.objects.filter(recipient__name__in=['Person 1', 'Person 2']))
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def assertUsesIndex(self, plan, index):
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotRegex(plan, r'SCAN emails_sentemail\b')
+
+    def captured_plan(self, pattern, run):
+        """Plan of the first query matching ``pattern`` that ``run()`` executes"""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        return query_plan(next(q['sql'] for q in queries if re.match(pattern, q['sql'])))
+
+    def changelist_plan(self, query):
+        """Plan of the page query the SentEmail changelist runs for ``query``"""
+        self.client.force_login(self.user)
+        url = reverse('admin:emails_sentemail_changelist') + query
+        return self.captured_plan(r'SELECT "emails_sentemail"\."id"', lambda: self.client.get(url))
+
+    def test_status_filter(self):
+        self.assertUsesIndex(self.changelist_plan('?status__exact=success'), 'sentemail_status_sent_at_idx')
+
+    def test_recipient_filter(self):
+        recipient = Recipient.objects.first()
+        plan = self.changelist_plan(f'?recipient__id__exact={recipient.pk}')
+        self.assertUsesIndex(plan, 'sentemail_recipient_sent_idx')
+
+    def test_queue(self):
+        sql, params = queued_emails().filter(unleased()).values('pk').query.sql_with_params()
+        self.assertUsesIndex(query_plan(sql, params), 'sentemail_queue_idx')
+
+    def test_lease_owner(self):
+        lease = Lease()
+        lease.claim(queued_emails(), 1)
+        for run in (lease.renew, lease.release):
+            with self.subTest(run.__name__):
+                plan = self.captured_plan(r'UPDATE "emails_sentemail"', run)
+                self.assertUsesIndex(plan, 'sentemail_lease_owner_idx')
+
+
+def random_text(rng, alphabet, length):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randrange(length)))
+
+
+class RenderingTests(SimpleTestCase):
+    """The compiled renderer and text skeletons give the same output as the code they replaced"""
+
+    RENDER_CASES = [
+        ('Hello {{name}}, see you at {{time}}', {'name': 'Ann', 'time': 10}),
+        ('{{name}}{{name}} {{missing}}', {'name': 'Ann'}),
+        ('No placeholders', {'name': 'Ann'}),
+        ('', {'name': 'Ann'}),
+        ('{{ name }} and {{name}}', {'name': 'Ann', ' name ': 'spaced'}),
+        ('{{name}}', {'name': None}),
+        # Values holding placeholders are filled again by later keys, but not by earlier ones
+        ('{{a}} {{b}}', {'a': '{{b}}', 'b': 'B'}),
+        ('{{a}} {{b}}', {'b': '{{a}}', 'a': 'A'}),
+        # Overlapping keys: one placeholder's text contains another's
+        ('{{a}}}} {{{{a}}}}', {'a': 'x', '{{a}}': 'y'}),
+        ('{{a}}', {'a}}{{a': 'z', 'a': 'x'}),
+        # Stray braces next to slots combine with values into new placeholders
+        ('{{{a}}}', {'a': 'b', '{b}': 'c', 'b': 'd'}),
+        ('{{{{a}}}}', {'a': 'b', 'b': 'c'}),
+        ('{a}} {{b}', {'a': 'x', 'b': 'y'}),
+        ('{{a}', {'a': 'x'}),
+        ('{{a}}', {'a': '{{'}),
+        ('{{a}}b}}', {'a': '{{', '{{b': 'c', 'b': 'd'}),
+    ]
+
+    def assertRendersLikeLegacy(self, source, context):
+        self.assertEqual(CompiledTemplate(source).render(context), legacy_render(source, context),
+                         f'{source!r} with {context!r}')
+
+    def test_render_cases(self):
+        for source, context in self.RENDER_CASES:
+            self.assertRendersLikeLegacy(source, context)
+
+    def test_render_random(self):
+        rng = random.Random(5)
+        for _ in range(20000):
+            source = random_text(rng, '{{}}ab ', 16)
+            context = {
+                random_text(rng, 'ab{}', 4): random_text(rng, '{}ab', 5) for _ in range(rng.randrange(4))
+            }
+            self.assertRendersLikeLegacy(source, context)
+
+    SKELETON_CASES = [
+        '<p>Hello {{name}},</p><p>See you at <b>{{time}}</b></p>',
+        '<a href="{{link}}">Join {{name}}</a>',
+        '<p>Fish &amp; {{dish}} &lt;3</p>',
+        '<!-- {{name}} --><p>{{name}}</p>',
+        '<p>{{name}}<br/>{{name}}</p>',
+        '<{{tag}}>x</{{tag}}>',
+        '&{{entity}};',
+        '<p {{attribute}}>x</p>',
+        '<p>1 < {{n}}</p>',
+        '<p>{{a}}<{{b}}</p>',
+        'Plain {{name}} text',
+        '<p>{{name</p>}}',
+        # Values that complete a comment, tag or entity name
+        '<!{{a}}->!&&',
+        '{{a}}<b >{{b}};&{{b}}',
+        '<p">&{{a}}',
+    ]
+    SKELETON_CONTEXTS = [
+        {},
+        {'name': 'Ann', 'time': '10:00', 'link': 'https://example.com/x?y=1', 'dish': 'chips'},
+        {'name': 'p', 'tag': 'b', 'entity': 'amp', 'attribute': 'class=x', 'n': '2', 'a': 'x', 'b': 'p'},
+        {'name': ' ', 'a': '', 'b': ''},
+        {'a': '-', 'b': 'b'},
+        {'a': 'b', 'b': 'b'},
+    ]
+
+    def assertSkeletonFills(self, body, context):
+        """A non-empty skeleton filled with a markup-free context equals the stripped filled body"""
+        skeleton = text_skeleton(body)
+        if skeleton and is_markup_free(context):
+            self.assertEqual(CompiledTemplate(skeleton).render(context), strip_tags(legacy_render(body, context)),
+                             f'{body!r} with {context!r}')
+        return skeleton
+
+    def test_skeleton_cases(self):
+        for body in self.SKELETON_CASES:
+            for context in self.SKELETON_CONTEXTS:
+                self.assertSkeletonFills(body, context)
+        # Ordinary templates get a skeleton, so the check above is not vacuous
+        self.assertTrue(all(text_skeleton(body) for body in self.SKELETON_CASES[:5]))
+
+    def test_skeleton_random(self):
+        rng = random.Random(6)
+        filled = 0
+        for _ in range(5000):
+            body = random_text(rng, ['<', '>', '/', 'p', 'b', ' ', '=', '"', '&', ';', '!', '-', '{{a}}', '{{b}}'], 14)
+            context = {key: random_text(rng, 'apb /=;!-', 4) for key in 'ab'}
+            filled += bool(self.assertSkeletonFills(body, context))
+        self.assertGreater(filled, 1000)
+
+
+class SendWorkerTests(TestCase):
+
+    def test_interrupted_batch_does_not_stop_the_worker(self):
+        """Emails sent before an error are recorded once and the worker goes on with the queue"""
+        seed(5)
+        enqueue(SentEmail.objects.all())
+        acquired = []
+
+        def acquire(recipients, stop_event=None, heartbeat=None):
+            acquired.append(recipients)
+            if len(acquired) == 3:
+                raise OperationalError('database is locked')
+            return True
+
+        limiter = mock.Mock(acquire=acquire)
+        with mock.patch('emails.sending.get_rate_limiter', return_value=limiter), \
+                self.assertLogs('emails.management.commands.run_send_worker', 'ERROR'):
+            call_command('run_send_worker', '--once', '--poll-interval', '0', stdout=io.StringIO())
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(SentEmail.objects.filter(status='success').count(), 5)
+        self.assertFalse(Lease().held().exists())
+
+
+class UpdateTrackedTests(TestCase):
+
+    def test_mixed_statuses_count_each_row_once(self):
+        """Rows moved into a key handled later are neither written nor counted twice"""
+        seed(3)
+        pending, *failed = SentEmail.objects.order_by('pk')
+        stats.update_tracked(SentEmail.objects.filter(pk__in=[obj.pk for obj in failed]), status='failed')
+        template_id = pending.template_id
+        day = timezone.localdate(pending.sent_at)
+
+        self.assertEqual(enqueue(SentEmail.objects.all()), 3)
+        self.assertEqual(stats.differences(), {})
+        self.assertEqual(
+            {status: count for status, count in DeliveryStat.objects.filter(day=day, template_id=template_id)
+             .values_list('status', 'count') if count},
+            {'pending': 3},
+        )
+
+
+class RecipientAutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+        Recipient.objects.create(name='Émile Zoë', email='emile@example.com')
+        Recipient.objects.create(name='Straße Team', email='team@example.com')
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def search(self, term):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'emails', 'model_name': 'sentemail', 'field_name': 'recipient', 'term': term,
+        })
+        return [result['text'].split(' (')[0] for result in response.json()['results']]
+
+    def test_non_ascii_name_prefix(self):
+        """Names match whatever the case of their non-ASCII letters"""
+        self.assertEqual(self.search('ÉMI'), ['Émile Zoë'])
+        self.assertEqual(self.search('émile z'), ['Émile Zoë'])
+        self.assertEqual(self.search('STRASSE'), ['Straße Team'])
+
+    def test_email_prefix(self):
+        self.assertEqual(self.search('PERSON1@'), ['Person 1'])
+
+    def test_name_index(self):
+        name_start, name_end = prefix_range('émi')
+        queryset = Recipient.objects.filter(name_normalized__gte=name_start, name_normalized__lt=name_end)
+        self.assertIn('USING INDEX recipient_name_norm_idx', query_plan(*queryset.query.sql_with_params()))
+
+
+class RecipientImportTests(TestCase):
+
+    def setUp(self):
+        for setting in ('MEDIA_ROOT', 'RECIPIENT_IMPORT_REJECTS_DIR'):
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            override = override_settings(**{setting: directory.name})
+            override.enable()
+            self.addCleanup(override.disable)
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+
+    def test_rejected_rows_are_private(self):
+        """Rejected rows are kept out of MEDIA_ROOT and downloaded through the admin"""
+        upload = ContentFile(b'name,email\nAnn,ann@example.com\nBob,not-an-email\n', name='people.csv')
+        response = self.client.post(reverse('admin:emails_recipient_import'), {'csv_file': upload}, follow=True)
+
+        self.assertEqual(Recipient.objects.get().email, 'ann@example.com')
+        url = re.search(r'href="([^"]+)">download rejected rows', response.content.decode()).group(1)
+        self.assertTrue(url.startswith(reverse('admin:emails_recipient_changelist') + 'import/rejects/'))
+        self.assertEqual(list(Path(settings.MEDIA_ROOT).rglob('*')), [])
+
+        download = self.client.get(url)
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(b'not-an-email', b''.join(download.streaming_content))
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_unknown_rejects_file(self):
+        url = reverse('admin:emails_recipient_import_rejects', args=['missing.csv'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class DeleteSentEmailsTests(TestCase):
+    """Archiving deletes only emails that are still finished and unleased"""
+
+    def test_keeps_emails_queued_again(self):
+        seed(6)
+        stats.update_tracked(SentEmail.objects.all(), status='success', sent_at=timezone.now())
+        requeued, leased, *finished = SentEmail.objects.order_by('pk')
+        stats.update_tracked(SentEmail.objects.filter(pk__in=[requeued.pk, leased.pk]), status='failed')
+        enqueue(SentEmail.objects.filter(pk=requeued.pk))
+        SentEmail.objects.filter(pk=leased.pk).update(lease_expires_at=timezone.now() + timedelta(minutes=5))
+
+        deleted = delete_sent_emails(list(SentEmail.objects.values_list('pk', flat=True)))
+
+        self.assertCountEqual(deleted, [obj.pk for obj in finished])
+        self.assertCountEqual(SentEmail.objects.values_list('pk', flat=True), [requeued.pk, leased.pk])
+        self.assertEqual(SentEmailAttachment.objects.count(), 2)
+        self.assertEqual(stats.differences(), {})
+
+
+class AttachmentCacheTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_cached_parts_match_attach(self):
+        """A cached part encodes exactly like ``EmailMessage.attach`` with the raw content"""
+        seed(1)
+        sent_email = SentEmail.objects.get()
+        for filename, content_type, content in [
+            ('cv.pdf', 'application/pdf', b'%PDF-1.4 \x00\xff'),
+            ('notes.txt', 'text/plain', 'Grüße'.encode()),
+            ('résumé.bin', '', b'\x00\x01'),
+        ]:
+            blob = AttachmentBlob.store(ContentFile(content, name=filename))
+            SentEmailAttachment.objects.create(
+                sent_email=sent_email, blob=blob, filename=filename, content_type=content_type, size=len(content)
+            )
+
+        def parts(message):
+            return [part.as_bytes() for part in message.message().get_payload()[1:]]
+
+        with_cache = build_message(sent_email, AttachmentCache())
+        self.assertEqual(parts(with_cache), parts(build_message(sent_email)))
+        self.assertEqual(len(parts(with_cache)), 3)
+
+
+class RateLimiterTests(TestCase):
+
+    def test_wait_calls_heartbeat(self):
+        """Waiting for tokens keeps calling ``heartbeat``, so a long wait does not let a lease expire"""
+        limiter = ratelimit.RateLimiter('test', messages_per_minute=60)
+        self.assertTrue(limiter.acquire(1))
+        beats = []
+        with mock.patch.object(ratelimit, 'WAIT_SLICE_SECONDS', 0.1):
+            self.assertTrue(limiter.acquire(1, heartbeat=lambda: beats.append(1)))
+        self.assertGreaterEqual(len(beats), 5)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ConcurrentAccessTests(TransactionTestCase):
+    """Send workers and admin readers share the SQLite file without "database is locked" errors"""
+
+    def setUp(self):
+        self.assertFalse(connection.is_in_memory_db(), 'needs a file-backed test database')
+        seed(200)
+        enqueue(SentEmail.objects.all())
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.errors = []
+        self.done = threading.Event()
+
+    def run_threads(self, workers, readers):
+        """Run ``workers`` to completion, with ``readers`` running until the last worker is done"""
+        def run(target):
+            try:
+                target()
+            except Exception as e:
+                self.errors.append(e)
+            finally:
+                connections.close_all()
+
+        worker_threads = [threading.Thread(target=run, args=(target,)) for target in workers]
+        reader_threads = [threading.Thread(target=run, args=(target,)) for target in readers]
+        for thread in worker_threads + reader_threads:
+            thread.start()
+        for thread in worker_threads:
+            thread.join()
+        self.done.set()
+        for thread in reader_threads:
+            thread.join()
+
+    def send_worker(self):
+        while ids := (lease := Lease()).claim(queued_emails(), 10):
+            write_results([(obj, True, '') for obj in SentEmail.objects.filter(pk__in=ids)], lease)
+
+    def changelist_reader(self, url):
+        client = Client()
+        client.force_login(self.user)
+        while not self.done.is_set():
+            self.assertEqual(client.get(url).status_code, 200)
+
+    def test_workers_and_changelists(self):
+        sent_emails = reverse('admin:emails_sentemail_changelist')
+        self.run_threads(
+            [self.send_worker, self.send_worker],
+            [
+                lambda: self.changelist_reader(sent_emails),
+                lambda: self.changelist_reader(sent_emails + '?status__exact=pending'),
+                lambda: self.changelist_reader(reverse('admin:emails_recipient_changelist')),
+            ],
+        )
+        self.assertEqual(self.errors, [])
+        self.assertEqual(SentEmail.objects.filter(status='success').count(), 200)
@@ -0,0 +1,99 @@
+import hashlib
+import mimetypes
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    FileUploadHandler, MemoryFileUploadHandler, SkipFile, TemporaryFileUploadHandler,
+)
+
+# Admin views whose uploads are email attachments
+ATTACHMENT_UPLOAD_VIEWS = {'emails_sentemail_add', 'emails_sentemail_change'}
+
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):.1f}MB"
+
+
+class AttachmentLimitUploadHandler(FileUploadHandler):
+    """Enforce the attachment size limits while files stream in.
+
+    Only active on the sent email admin forms, where it must run first in the
+    handler chain. A file is skipped as soon as it grows past
+    ``EMAIL_ATTACHMENT_MAX_BYTES`` or takes the request past
+    ``EMAIL_ATTACHMENT_TOTAL_MAX_BYTES``: its remaining bytes are read and
+    discarded instead of being buffered, and the reason is kept in
+    ``request.upload_errors`` by field name for the form to report.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        match = getattr(request, 'resolver_match', None)
+        self.active = match is not None and match.url_name in ATTACHMENT_UPLOAD_VIEWS
+        self.total = 0
+        if self.active:
+            request.upload_errors = {}
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.received = 0
+        if self.active and content_length is not None:
+            self.check(content_length)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.active:
+            self.received += len(raw_data)
+            self.check(self.received)
+        return raw_data
+
+    def check(self, size):
+        if size > settings.EMAIL_ATTACHMENT_MAX_BYTES:
+            self.skip(f"File '{self.file_name}' exceeds the {megabytes(settings.EMAIL_ATTACHMENT_MAX_BYTES)} limit.")
+        if self.total + size > settings.EMAIL_ATTACHMENT_TOTAL_MAX_BYTES:
+            self.skip(f"File '{self.file_name}' takes the attachments past the "
+                      f"{megabytes(settings.EMAIL_ATTACHMENT_TOTAL_MAX_BYTES)} total limit.")
+
+    def skip(self, error):
+        self.request.upload_errors[self.field_name] = error
+        raise SkipFile(error)
+
+    def file_complete(self, file_size):
+        if self.active:
+            self.total += file_size
+        return None
+
+
+class HashingUploadMixin:
+    """Compute the SHA-256 of an uploaded file while it streams in.
+
+    The digest is set as ``sha256`` on the resulting uploaded file, and a
+    missing or generic content type is guessed from the file name. Each chunk
+    is hashed by the handler that keeps it, so content is only hashed once
+    however the handlers are chained.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Before the memory handler raises StopFutureHandlers to claim the file
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed_on = super().receive_data_chunk(raw_data, start)
+        if passed_on is None:
+            self.sha256.update(raw_data)
+        return passed_on
+
+    def file_complete(self, file_size):
+        file_obj = super().file_complete(file_size)
+        if file_obj is not None:
+            file_obj.sha256 = self.sha256.hexdigest()
+            if not file_obj.content_type or file_obj.content_type == 'application/octet-stream':
+                file_obj.content_type = mimetypes.guess_type(file_obj.name)[0] or 'application/octet-stream'
+        return file_obj
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
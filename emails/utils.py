@@ -0,0 +1,18 @@
+from itertools import islice
+
+
+def normalize_email(email):
+    """Case-insensitive form of an address, used to match recipients"""
+    return (email or '').strip().lower()
+
+
+def normalize_name(name):
+    """Case-insensitive form of a name, folding non-ASCII letters that SQLite's LOWER() leaves alone"""
+    return (name or '').strip().casefold()
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
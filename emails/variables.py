@@ -0,0 +1,58 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CustomVariable
+
+VERSION_KEY = 'custom-variables:version'
+
+
+class VariableRegistry:
+    """Process-local copy of the active custom variables and their defaults.
+
+    Edits replace a version key in the shared cache. Each process compares its
+    copy with that key at most once every ``refresh_seconds``, so edits reach
+    all processes within that time while most lookups touch neither the cache
+    nor the database.
+    """
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._defaults = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def defaults(self):
+        """``{name: default_value}`` of every active custom variable"""
+        with self._lock:
+            if self._defaults is None or time.monotonic() - self._checked_at >= self.refresh_seconds:
+                self._refresh()
+            return dict(self._defaults)
+
+    def _refresh(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        if self._defaults is None or version != self._version:
+            key = f'custom-variables:{version}'
+            defaults = cache.get(key)
+            if defaults is None:
+                defaults = dict(CustomVariable.objects.filter(is_active=True).values_list('name', 'default_value'))
+                cache.set(key, defaults)
+            self._defaults = defaults
+            self._version = version
+        self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Make every process reload the defaults"""
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._defaults = None
+
+
+variable_registry = VariableRegistry(settings.CUSTOM_VARIABLE_REFRESH_SECONDS)
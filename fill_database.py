@@ -162,7 +162,7 @@ for cv_data in custom_variables_data:
         )
 
 # 4) Create Recipients
-existing_recipients = set(Recipient.objects.values_list("email", flat=True))
+existing_recipients = set(Recipient.objects.values_list("email_normalized", flat=True))
 sample_recipients = [
     {"name": "John Doe", "email": "john.doe@example.com", "position": "Software Engineer"},
     {"name": "Jane Smith", "email": "jane.smith@example.com", "position": "Product Manager"},
@@ -177,7 +177,7 @@ sample_recipients = [
 ]
 
 for recipient_data in sample_recipients:
-    if recipient_data["email"] not in existing_recipients:
+    if recipient_data["email"].lower() not in existing_recipients:
         position = Position.objects.filter(name=recipient_data["position"]).first()
         Recipient.objects.create(
             name=recipient_data["name"],